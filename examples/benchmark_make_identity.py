@@ -0,0 +1,61 @@
+"""
+Measures make_identity() time per million nodes and edges, and the length
+of the identities, for each identity strategy. It doesn't need a database.
+"""
+import time
+
+from dataclasses import dataclass
+
+from sqerzo import GraphEdge, GraphNode
+from sqerzo.config import SQErzoConfig
+
+ELEMENTS = 1000000
+
+
+@dataclass
+class UserNode(GraphNode):
+    __keys__ = ["name", "email"]
+
+    name: str = None
+    email: str = None
+    age: int = None
+
+
+class MeetEdge(GraphEdge):
+    pass
+
+
+def benchmark(strategy: str):
+    SQErzoConfig.IDENTITY_STRATEGY = strategy
+
+    nodes = [
+        UserNode(name=f"UName-{n}", email=f"user-{n}@example.com", age=n)
+        for n in range(ELEMENTS)
+    ]
+
+    start = time.perf_counter()
+    for node in nodes:
+        node.make_identity()
+    nodes_time = time.perf_counter() - start
+
+    edges = [
+        MeetEdge(source=nodes[n], destination=nodes[n - 1])
+        for n in range(ELEMENTS)
+    ]
+
+    start = time.perf_counter()
+    for edge in edges:
+        edge.make_identity()
+    edges_time = time.perf_counter() - start
+
+    print(f"{strategy:>10} | {nodes_time:>10.2f} | {edges_time:>10.2f} | "
+          f"{len(nodes[0].identity):>8}")
+
+
+if __name__ == '__main__':
+    print(f"Seconds per {ELEMENTS} elements")
+    print(f"{'strategy':>10} | {'nodes (s)':>10} | {'edges (s)':>10} | "
+          f"{'length':>8}")
+
+    for s in ("sha512", "blake2b", "truncated", "raw"):
+        benchmark(s)
@@ -0,0 +1,62 @@
+"""
+Measures memory used by nodes kept in memory before a transaction commit,
+with regular dataclass nodes and with slotted nodes. It doesn't need a
+database.
+"""
+import time
+import tracemalloc
+
+from dataclasses import dataclass
+
+from sqerzo import GraphNode
+
+ELEMENTS = 1000000
+
+
+@dataclass
+class UserNode(GraphNode):
+    __keys__ = ["email"]
+
+    name: str = None
+    email: str = None
+    age: int = None
+
+
+class SlottedUserNode(GraphNode):
+    __slotted__ = True
+    __labels__ = ["User"]
+    __keys__ = ["email"]
+
+    name: str = None
+    email: str = None
+    age: int = None
+
+
+def benchmark(node_class):
+    # Values are shared by both runs, so only node overhead is measured
+    names = [f"UName-{n}" for n in range(ELEMENTS)]
+    emails = [f"user-{n}@example.com" for n in range(ELEMENTS)]
+
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    nodes = [
+        node_class(name=names[n], email=emails[n], age=n % 90)
+        for n in range(ELEMENTS)
+    ]
+    elapsed = time.perf_counter() - start
+
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{node_class.__name__:>16} | {memory / 1024 / 1024:>12.1f} | "
+          f"{elapsed:>10.2f}")
+
+    return nodes
+
+
+if __name__ == '__main__':
+    print(f"{ELEMENTS} nodes")
+    print(f"{'':>16} | {'memory (MB)':>12} | {'create (s)':>10}")
+    benchmark(UserNode)
+    benchmark(SlottedUserNode)
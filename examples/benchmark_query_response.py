@@ -0,0 +1,72 @@
+"""
+Measures the memory allocated, and the time spent, to read the rows of a
+RedisGraph query with 3 node columns. Rows are kept in a list, as
+Query.execute() does, and only the identity of the first column is read. It doesn't need a database: the query
+result is built in memory.
+"""
+import time
+import tracemalloc
+
+from redisgraph.node import Node
+
+from sqerzo.graph.cypher.redisgraph import RedisGraphSQErzoQueryResponse
+
+ROWS = 100000
+
+
+class FakeQueryResult:
+
+    def __init__(self, rows: int):
+        self.header = [[1, b"a"], [1, b"b"], [1, b"c"]]
+        self.result_set = [
+            [
+                Node(
+                    node_id=i * 3 + j,
+                    label="User",
+                    properties={
+                        "identity": f"{i}-{j}",
+                        "name": f"name-{i}",
+                        "email": f"user-{i}@example.com",
+                        "age": i % 90
+                    }
+                )
+                for j in range(3)
+            ]
+            for i in range(rows)
+        ]
+
+
+class FakeConnection:
+
+    def __init__(self, rows: int):
+        self.result = FakeQueryResult(rows)
+
+    def query(self, query: str, params: dict):
+        return self.result
+
+
+class FakeGraph:
+
+    def __init__(self, rows: int):
+        self.connection = FakeConnection(rows)
+
+
+def main():
+    graph = FakeGraph(ROWS)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    rows = list(RedisGraphSQErzoQueryResponse(graph, "MATCH ..."))
+    identities = [row[0].properties["identity"] for row in rows]
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(identities)} rows: {peak / 1024 / 1024:.1f} MB peak, "
+          f"{elapsed / ROWS * 1e6:.2f} us per row")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 from .cache import *
 from .graph.model import *
+from .graph.identity import *
 from .graph.transaction import *
 from .graph.interfaces import *
 from .__sqerzo__ import *
+from .__sqerzo_async__ import *
+from .loader import *
@@ -3,13 +3,14 @@ from __future__ import annotations
 import logging
 import urllib.parse as pr
 
-from typing import Type, List, Iterable
+from typing import Type, List, Iterable, Callable
 
 from .cache import *
 from .config import *
 from .exceptions import *
 from .graph.model import *
 from .graph.query import Query
+from .graph.helpers import fetch_filters, fetch_one_filters
 from .graph.transaction import SQErzoTransaction
 from .graph.interfaces import SQErzoGraphConnection
 from .graph.cypher.neo4j import Neo4JSQErzoGraphConnection
@@ -20,22 +21,68 @@ log = logging.getLogger("sqerzo")
 _SUPPORTED_TYPES = ("str",)
 _SUPPORTED_TYPES_REDIS = ("str", "int", "float", "bool")
 _SUPPORTED_TYPES_NEO4J = ("str", "int", "float", "bool", "datetime")
+_DEFAULT_CACHE_ENTRIES = 100000
 
 
 class SQErzoGraph:
 
-    def __init__(self, connection_string: str = None, cache: str = None):
+    def __init__(self,
+                 connection_string: str = None,
+                 cache: str = None,
+                 known_identities: str = None):
         self.connection_string = self._fix_connection_string(connection_string)
         self.db_engine: SQErzoGraphConnection = self._setup_db(self.connection_string)
         self.cache = self._setup_cache(cache)
+        self.known_identities = self._setup_known_identities(known_identities)
 
         self._create_constrains()
 
-    def transaction(self) -> SQErzoTransaction:
-        return self.db_engine.transaction_class(self)
+    def transaction(self,
+                    background: bool = False,
+                    queue_size: int = 4,
+                    mode: str = "create",
+                    retries: int = 5,
+                    atomic: bool = False) -> SQErzoTransaction:
+        """
+        Elements are written in chunks while they are added, so only one
+        chunk is kept in memory. With 'background' enabled, chunks of
+        elements are written by a background thread while new elements are
+        added. 'queue_size' is the max number of chunks waiting to be
+        written.
+
+        'mode' is 'create' or 'upsert'. Upsert transactions merge elements
+        by their identity, so they can be replayed without duplicating data.
+
+        Each chunk is written in its own DB engine transaction. Chunks that
+        fail by transient errors, like deadlocks, are retried up to
+        'retries' times.
+
+        With 'atomic' enabled, all chunks are written in one DB engine
+        transaction: all of them are written at commit, or none.
+        """
+        return self.db_engine.transaction_class(
+            self,
+            background=background,
+            queue_size=queue_size,
+            mode=mode,
+            retries=retries,
+            atomic=atomic
+        )
 
     def update(self, node: GraphElement):
-        self.db_engine.update_element(node)
+        """Write changed properties and added labels. If nothing changed,
+        DB is not queried"""
+        if self.db_engine.update_element(node) and isinstance(node, GraphNode):
+            self.cache.write([node])
+
+    def update_many(self, nodes: Iterable[GraphNode]):
+        """Update many nodes. Nodes of the same class with the same changes
+        are updated with one query for each batch of nodes"""
+        self.cache.write([
+            node
+            for node in self.db_engine.update_elements(nodes)
+            if isinstance(node, GraphNode)
+        ])
 
     def get_node_by_id(self, node_id: str, map_class: Type[GraphNode]) \
             -> Type or None:
@@ -46,21 +93,153 @@ class SQErzoGraph:
         if node_cache := self.cache.get_id(node_id):
             return node_cache
 
-        if found := self.db_engine.get_node_by_id(node_id):
+        if found := self.db_engine.get_node_by_id(
+                node_id, map_class.__labels__
+        ):
             node = map_class.from_query_results(found)
 
             self.cache.save_id(node_id, node)
 
             return node
 
+    def get_nodes_by_ids(self,
+                         node_ids: Iterable[str],
+                         map_class: Type[GraphNode],
+                         batch_size: int = None) -> List[GraphNode or None]:
+        """
+        Recover many nodes by their ids. Cached nodes are taken from cache
+        and the rest are fetched from DB in one query for each 'batch_size'
+        ids.
+
+        Returns a list of nodes in the same order than 'node_ids'. Not found
+        nodes are returned as None.
+        """
+        node_ids = list(node_ids)
+
+        if not node_ids:
+            return []
+
+        found = {
+            node_id: node
+            for node_id, node in zip(node_ids, self.cache.get_ids(node_ids))
+            if node is not None
+        }
+
+        # Keep order & remove duplicates
+        missing = list(dict.fromkeys(
+            node_id for node_id in node_ids
+            if node_id and node_id not in found
+        ))
+
+        chunk_size = batch_size or self.db_engine.batch_size
+
+        for i in range(0, len(missing), chunk_size):
+            recovered = {}
+
+            for res in self.db_engine.get_nodes_by_ids(
+                    missing[i:i + chunk_size], map_class.__labels__
+            ):
+                node = map_class.from_query_results(res)
+                recovered[node.identity] = node
+
+            self.cache.save_ids(recovered)
+            found.update(recovered)
+
+        return [found.get(node_id) for node_id in node_ids]
+
     def save(self, graph_element: GraphElement) \
             -> None or SQErzoElementExistException:
         self.db_engine.save_element(graph_element)
 
-
-    def truncate(self):
-        """Remove all nodes and edges of database"""
-        self.db_engine.truncate()
+        if isinstance(graph_element, GraphNode):
+            self.cache.write([graph_element])
+
+            if self.known_identities is not None:
+                self.known_identities.add(graph_element.identity)
+
+    def get_or_create(self, graph_element: GraphElement) -> GraphElement:
+        """
+        Create the element if it doesn't exist, in one query. Nodes are
+        matched by their identity, built from their '__keys__'. Edges are
+        matched by their identity and their source and destination nodes.
+
+        Returns the stored node, with its stored properties, or the edge.
+        """
+        found = self.db_engine.get_or_create_element(graph_element)
+
+        if not isinstance(graph_element, GraphNode):
+            return graph_element
+
+        node = graph_element.__class__.from_query_results(found)
+        self.cache.save_id(node.identity, node)
+
+        if self.known_identities is not None:
+            self.known_identities.add(node.identity)
+
+        return node
+
+    def delete(self, graph_element: GraphElement, detach: bool = True) \
+            -> bool:
+        """
+        Remove a node or an edge. Nodes are removed with their edges, unless
+        'detach' is False. Then, nodes with edges can't be removed.
+
+        Returns False if the element doesn't exist.
+
+        Known identities filter can't forget one identity, so it's cleared
+        when a node is removed. Otherwise, transactions would skip the node
+        if it's created again.
+        """
+        deleted = self.db_engine.delete_element(graph_element, detach)
+
+        if isinstance(graph_element, GraphNode):
+            self.cache.delete_id(graph_element.identity)
+
+            if deleted:
+                self._forget_known_identities()
+
+        return deleted
+
+    def delete_many(self,
+                    element_type: Type[GraphElement],
+                    batch_size: int = None,
+                    detach: bool = True,
+                    progress: Callable[[int], None] = None,
+                    **kwargs) -> int:
+        """
+        Remove nodes or edges of 'element_type' that match with properties
+        in 'kwargs'. They are removed in chunks of 'batch_size' (default: DB
+        engine batch_size), one query for each chunk, so the graph isn't
+        locked for long. 'progress' is called after each chunk with the
+        number of elements removed so far.
+
+        Returns the number of removed elements.
+        """
+        deleted = self.db_engine.delete_elements(
+            element_type,
+            filters=kwargs,
+            batch_size=batch_size,
+            detach=detach,
+            progress=progress
+        )
+
+        # Removed ids are unknown
+        if deleted and issubclass(element_type, GraphNode):
+            self.cache.clear()
+            self._forget_known_identities()
+
+        return deleted
+
+    def truncate(self,
+                 batch_size: int = None,
+                 progress: Callable[[int], None] = None) -> int:
+        """Remove all nodes and edges of database. Nodes are removed in
+        chunks, as in delete_many(). Returns the number of removed nodes"""
+        deleted = self.db_engine.truncate(batch_size, progress)
+        self.cache.clear()
+        self._forget_known_identities()
+
+        return deleted
 
     @property
     def Q(self) -> Query:
@@ -72,28 +251,156 @@ class SQErzoGraph:
 
     def fetch_many(self,
                    node_type: Type[GraphElement] or GraphElement,
+                   filters: dict = None,
+                   *,
+                   page_size: int = -1,
+                   skip: int = None,
+                   limit: int = None,
+                   order_by: str = None,
                    **kwargs) \
             -> Iterable[GraphElement] or SQErzoException:
-        for x in self.db_engine.fetch_nodes(node_type, **kwargs):
-            yield x
+        """
+        Fetch nodes that match with properties in 'filters' and 'kwargs'.
+        Nodes are streamed by pages of 'page_size' nodes (default: DB engine
+        batch_size). Set 'page_size' to None to fetch all nodes in one query.
 
-    def fetch_one(self,
-                   node_type: Type[GraphElement] or GraphElement,
-                   **kwargs) \
-            -> Iterable[GraphElement] or SQErzoException:
+        'order_by' is a property name. Use '-' prefix for descending order.
+
+        Pagination parameters are keyword-only. Properties named as one of
+        them, like 'limit', are filtered with 'filters':
+
+            fetch_many(LogNode, {"limit": 10}, limit=5)
+
+        See helpers.fetch_filters for the deprecated behaviour without
+        'filters'.
+        """
+        filters, paging = fetch_filters(
+            node_type, filters, kwargs,
+            page_size=page_size, skip=skip, limit=limit, order_by=order_by
+        )
 
-        for res in self.fetch_many(node_type, **kwargs):
+        yield from self._fetch_nodes(node_type, filters, **paging)
+
+    def fetch_one(self,
+                  node_type: Type[GraphElement] or GraphElement,
+                  filters: dict = None,
+                  *,
+                  page_size: int = -1,
+                  skip: int = None,
+                  limit: int = None,
+                  order_by: str = None,
+                  **kwargs) \
+            -> GraphElement or SQErzoException:
+        """First node that match with properties in 'filters' and 'kwargs'.
+        Keyword arguments are read as in fetch_many(). Only one node is
+        fetched, so 'page_size' and 'limit' can't be set"""
+        filters, paging = fetch_one_filters(
+            node_type, filters, kwargs,
+            page_size=page_size, skip=skip, limit=limit, order_by=order_by
+        )
+
+        for res in self._fetch_nodes(node_type, filters, **paging):
             return res
 
     # -------------------------------------------------------------------------
     # Private methods
     # -------------------------------------------------------------------------
+    def _forget_known_identities(self):
+        """Clear the known identities filter after nodes are removed. It
+        can't remove one identity. Transactions write known nodes again, so
+        nodes that still exist are taken as new ones"""
+        if self.known_identities is not None:
+            self.known_identities.clear()
+
+    def _fetch_nodes(self,
+                     node_type: Type[GraphElement] or GraphElement,
+                     filters: dict,
+                     page_size: int = -1,
+                     skip: int = None,
+                     limit: int = None,
+                     order_by: str = None) -> Iterable[GraphElement]:
+        if page_size == -1:
+            page_size = self.db_engine.batch_size
+
+        yield from self.db_engine.fetch_nodes(
+            node_type,
+            filters,
+            page_size=page_size,
+            skip=skip,
+            limit=limit,
+            order_by=order_by
+        )
+
     def _setup_cache(self, cache_config: str):
-        if cache_config is None or cache_config == "memory://":
-            return MemoryGraphNodeCache()
+        """
+        Cache config is an URL. Supported caches:
+
+        - memory://?max_entries=100000&max_bytes=0&ttl=300&policy=lru
+        - redis://127.0.0.1:6379/0?ttl=300&prefix=sqerzo:node:
+
+        Both support the 'write' parameter, to set how cache is updated
+        when nodes are written: 'invalidate' (default) or 'through'
+        """
+        if cache_config is None:
+            cache_config = "memory://"
+
+        parsed = pr.urlparse(cache_config)
+        params = dict(pr.parse_qsl(parsed.query))
+
+        if parsed.scheme == "memory":
+            try:
+                return MemoryGraphNodeCache(
+                    max_entries=int(
+                        params.get("max_entries", _DEFAULT_CACHE_ENTRIES)
+                    ) or None,
+                    max_bytes=int(params.get("max_bytes", 0)) or None,
+                    ttl=float(params.get("ttl", 0)) or None,
+                    policy=params.get("policy", "lru"),
+                    write_policy=params.get("write", "invalidate")
+                )
+            except ValueError as e:
+                raise ValueError(
+                    f"Invalid cache config: '{cache_config}': {e}"
+                )
+
+        elif parsed.scheme in ("redis", "rediss"):
+            try:
+                return RedisGraphNodeCache.from_url(cache_config)
+            except ValueError as e:
+                raise ValueError(
+                    f"Invalid cache config: '{cache_config}': {e}"
+                )
+
         else:
             raise ValueError(f"Invalid cache config: '{cache_config}'")
 
+    def _setup_known_identities(self, config: str or None) \
+            -> IdentityBloomFilter or None:
+        """
+        Filter of node identities already written, used by transactions to
+        skip known nodes. Disabled by default. Config is an URL:
+
+        - bloom:///path/to/file?capacity=1000000&error_rate=0.001
+
+        Without path, the filter is kept only in memory. Otherwise it's
+        loaded from the file, if it exists, and known_identities.save()
+        writes it.
+        """
+        if config is None:
+            return None
+
+        parsed = pr.urlparse(config)
+
+        if parsed.scheme != "bloom":
+            raise ValueError(f"Invalid known identities config: '{config}'")
+
+        try:
+            return IdentityBloomFilter.from_url(config)
+        except ValueError as e:
+            raise ValueError(
+                f"Invalid known identities config: '{config}': {e}"
+            )
+
     def _fix_connection_string(self, cs: str) -> str:
 
         parsed = pr.urlparse(cs)
@@ -1 +1,4 @@
+from .interfaces import *
 from .memory import *
+from .redis import *
+from .bloom import *
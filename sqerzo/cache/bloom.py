@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import math
+import struct
+import hashlib
+import threading
+import urllib.parse as pr
+
+from typing import Iterable
+
+_MAGIC = b"SQBF"
+
+# magic, version, bits, hashes, capacity, error rate, entries
+_HEADER = struct.Struct("<4sBQIQdQ")
+
+
+class IdentityBloomFilter:
+    """
+    Bloom filter of identities already written in the graph. Transactions
+    use it to skip nodes that were committed before, in this or in previous
+    runs.
+
+    - **capacity**: expected number of identities.
+    - **error_rate**: false positive rate when 'capacity' identities are
+      added. A false positive means a new node is taken as known and it's
+      not written.
+    - **path**: file where the filter is loaded from, if it exists, and
+      saved to by save().
+
+    Counters are available in stats().
+    """
+
+    def __init__(self,
+                 capacity: int = 1000000,
+                 error_rate: float = 0.001,
+                 path: str = None):
+
+        if capacity <= 0:
+            raise ValueError(f"Invalid bloom filter capacity: {capacity}")
+
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Invalid bloom filter error rate: {error_rate}")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+
+        self.bits = math.ceil(
+            -capacity * math.log(error_rate) / (math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.entries = 0
+        self.skipped = 0
+
+        self._array = bytearray((self.bits + 7) // 8)
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @classmethod
+    def from_url(cls, url: str) -> IdentityBloomFilter:
+        """
+        URL format: bloom:///path/to/file?capacity=1000000&error_rate=0.001
+
+        Without path, the filter is only kept in memory.
+        """
+        parsed = pr.urlparse(url)
+        params = dict(pr.parse_qsl(parsed.query))
+
+        return cls(
+            capacity=int(params.get("capacity", 1000000)),
+            error_rate=float(params.get("error_rate", 0.001)),
+            path=parsed.path or None
+        )
+
+    def __contains__(self, identity: str) -> bool:
+        array = self._array
+
+        for pos in self._positions(identity):
+            if not array[pos >> 3] & (1 << (pos & 7)):
+                return False
+
+        return True
+
+    def add(self, identity: str):
+        self.update((identity,))
+
+    def update(self, identities: Iterable[str]):
+        with self._lock:
+            array = self._array
+
+            for identity in identities:
+                for pos in self._positions(identity):
+                    array[pos >> 3] |= 1 << (pos & 7)
+
+                self.entries += 1
+
+    def clear(self):
+        with self._lock:
+            self._array = bytearray(len(self._array))
+            self.entries = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.entries,
+            "skipped": self.skipped,
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "bytes": len(self._array)
+        }
+
+    def save(self, path: str = None):
+        """Save the filter to 'path' (default: configured path). The file is
+        replaced atomically"""
+        path = path or self.path
+
+        if not path:
+            raise ValueError("Bloom filter has no path to be saved")
+
+        tmp = f"{path}.tmp"
+
+        with self._lock, open(tmp, "wb") as f:
+            f.write(_HEADER.pack(
+                _MAGIC, 1, self.bits, self.hashes, self.capacity,
+                self.error_rate, self.entries
+            ))
+            f.write(self._array)
+
+        os.replace(tmp, path)
+
+    def load(self, path: str = None):
+        path = path or self.path
+
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            array = bytearray(f.read())
+
+        try:
+            magic, version, bits, hashes, capacity, error_rate, entries = \
+                _HEADER.unpack(header)
+        except struct.error:
+            raise ValueError(f"Invalid bloom filter file: '{path}'")
+
+        if magic != _MAGIC or len(array) != (bits + 7) // 8:
+            raise ValueError(f"Invalid bloom filter file: '{path}'")
+
+        with self._lock:
+            self.bits = bits
+            self.hashes = hashes
+            self.capacity = capacity
+            self.error_rate = error_rate
+            self.entries = entries
+            self._array = array
+
+    def _positions(self, identity: str) -> Iterable[int]:
+        # Double hashing: k positions from one 128 bits digest
+        digest = hashlib.blake2b(identity.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        bits = self.bits
+
+        return ((h1 + i * h2) % bits for i in range(self.hashes))
+
+
+__all__ = ("IdentityBloomFilter",)
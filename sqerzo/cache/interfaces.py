@@ -0,0 +1,103 @@
+import abc
+import asyncio
+import functools
+
+from typing import List, Dict, Iterable, Callable
+
+_WRITE_POLICIES = ("invalidate", "through")
+
+
+class GraphNodeCache(metaclass=abc.ABCMeta):
+    """
+    Base class for node caches.
+
+    **write_policy** sets what happens with cached nodes when they are
+    written in the graph (save, update or transaction commit):
+
+    - invalidate: cached node is removed. Next read will recover it from DB.
+    - through: cache stores the written node.
+    """
+
+    # Cache operations wait for network I/O. asyncio API runs them in a
+    # thread pool, so they don't block the event loop
+    BLOCKING = False
+
+    def __init__(self, write_policy: str = "invalidate"):
+        if write_policy not in _WRITE_POLICIES:
+            raise ValueError(
+                f"Invalid cache write policy '{write_policy}'. "
+                f"Valid values: {_WRITE_POLICIES}"
+            )
+
+        self.write_policy = write_policy
+
+    @abc.abstractmethod
+    def get_id(self, node_id: str) -> object or None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def save_id(self, node_id: str, obj: object):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def delete_ids(self, node_ids: List[str]):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def clear(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        raise NotImplementedError()
+
+    def get_ids(self, node_ids: List[str]) -> List[object or None]:
+        return [self.get_id(node_id) for node_id in node_ids]
+
+    def save_ids(self, nodes: Dict[str, object]):
+        for node_id, obj in nodes.items():
+            self.save_id(node_id, obj)
+
+    def delete_id(self, node_id: str):
+        self.delete_ids([node_id])
+
+    def make_key(self, node):
+
+        if k := node.identity:
+            return k
+        else:
+            k = "#".join(
+                getattr(node, k)
+                for k in node.__keys__
+            )
+            return k
+
+    def get(self, node: object) -> object or None:
+        return self.get_id(node.make_identity())
+
+    def save(self, node: object):
+        key = self.make_key(node)
+        self.save_id(key, node)
+
+    async def run_async(self, func: Callable, *args):
+        """Call a cache method from asyncio code:
+
+            node = await cache.run_async(cache.get_id, node_id)
+        """
+        if not self.BLOCKING:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    def write(self, nodes: Iterable[object]):
+        """Update cache with nodes written in the graph, following the
+        cache write policy"""
+        if self.write_policy == "through":
+            self.save_ids({self.make_key(n): n for n in nodes})
+        else:
+            self.delete_ids([self.make_key(n) for n in nodes])
+
+
+__all__ = ("GraphNodeCache",)
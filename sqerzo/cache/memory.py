@@ -1,37 +1,216 @@
-class MemoryGraphNodeCache:
+import sys
+import time
+import threading
 
-    def __init__(self):
-        self._cache = {}
+from typing import List
+from collections import OrderedDict, defaultdict
+
+from .interfaces import GraphNodeCache
+
+_POLICIES = ("lru", "lfu")
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expires", "size", "freq")
+
+    def __init__(self, value: object, expires: float or None, size: int):
+        self.value = value
+        self.expires = expires
+        self.size = size
+        self.freq = 1
+
+
+def _sizeof(obj: object) -> int:
+    """Approximated size of a cached node: the object, its attributes and
+    its properties. It doesn't follow references deeper than that"""
+    size = sys.getsizeof(obj)
+
+    if attrs := getattr(obj, "__dict__", None):
+        size += sys.getsizeof(attrs)
+        size += sum(sys.getsizeof(v) for v in attrs.values())
+
+    elif fields := getattr(obj, "__dataclass_fields__", None):
+        # Slotted nodes
+        size += sum(sys.getsizeof(getattr(obj, f, None)) for f in fields)
+
+    if props := getattr(obj, "properties", None):
+        size += sum(sys.getsizeof(v) for v in props.values())
+
+    return size
 
-    def make_key(self, node):
 
-        if k := node.identity:
-            return k
-        else:
-            k = "#".join(
-                getattr(node, k)
-                for k in node.__keys__
+class MemoryGraphNodeCache(GraphNodeCache):
+    """
+    In memory node cache, bounded by number of entries and/or by an
+    approximated size in bytes.
+
+    - **max_entries**: max number of cached nodes. None means no limit.
+    - **max_bytes**: max approximated size of cached nodes. None means no limit.
+    - **ttl**: seconds a cached node is valid. None means no expiration.
+    - **policy**: eviction policy when cache is full: 'lru' or 'lfu'.
+    - **write_policy**: 'invalidate' or 'through'. See GraphNodeCache.
+
+    Cache counters are available in: hits, misses and evictions.
+    """
+
+    def __init__(self,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 ttl: float = None,
+                 policy: str = "lru",
+                 write_policy: str = "invalidate"):
+        super(MemoryGraphNodeCache, self).__init__(write_policy)
+
+        if policy not in _POLICIES:
+            raise ValueError(
+                f"Invalid cache policy '{policy}'. Valid values: {_POLICIES}"
             )
-            return k
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._cache = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        # LRU: keys from least to most recently used
+        self._lru = OrderedDict()
+
+        # LFU: frequency -> keys from least to most recently used
+        self._lfu = defaultdict(OrderedDict)
+        self._lfu_min = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._cache),
+            "bytes": self._bytes
+        }
 
     def get_id(self, node_id: str) -> object or None:
-        try:
-            return self._cache[node_id]
-        except KeyError:
-            return None
+        with self._lock:
+            try:
+                entry = self._cache[node_id]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            if entry.expires is not None and entry.expires < time.monotonic():
+                self._remove(node_id)
+                self.misses += 1
+                return None
+
+            self._touch(node_id, entry)
+            self.hits += 1
+
+            return entry.value
 
     def save_id(self, node_id: str, obj: object) -> object or None:
-        self._cache[node_id] = obj
+        size = _sizeof(obj) if self.max_bytes else 0
+        expires = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            if node_id in self._cache:
+                self._remove(node_id)
+
+            # Node doesn't fit in the cache
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._evict(size)
+
+            entry = _CacheEntry(obj, expires, size)
+            self._cache[node_id] = entry
+            self._bytes += size
+
+            if self.policy == "lru":
+                self._lru[node_id] = None
+            else:
+                self._lfu[1][node_id] = None
+                self._lfu_min = 1
+
+    def delete_ids(self, node_ids: List[str]):
+        with self._lock:
+            for node_id in node_ids:
+                if node_id in self._cache:
+                    self._remove(node_id)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._lru.clear()
+            self._lfu.clear()
+            self._bytes = 0
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+    def _is_full(self, new_size: int) -> bool:
+        if self.max_entries is not None and \
+                len(self._cache) >= self.max_entries:
+            return True
+
+        if self.max_bytes is not None and \
+                self._bytes + new_size > self.max_bytes:
+            return True
+
+        return False
+
+    def _evict(self, new_size: int):
+        """Make room for a new entry of size 'new_size'"""
+        while self._cache and self._is_full(new_size):
+            if self.policy == "lru":
+                key = next(iter(self._lru))
+            else:
+                key = next(iter(self._lfu[self._lfu_min]))
+
+            self._remove(key)
+            self.evictions += 1
+
+    def _touch(self, key: str, entry: _CacheEntry):
+        if self.policy == "lru":
+            self._lru.move_to_end(key)
+            return
+
+        bucket = self._lfu[entry.freq]
+        del bucket[key]
+
+        if not bucket:
+            del self._lfu[entry.freq]
+
+            if self._lfu_min == entry.freq:
+                self._lfu_min = entry.freq + 1
+
+        entry.freq += 1
+        self._lfu[entry.freq][key] = None
+
+    def _remove(self, key: str):
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size
+
+        if self.policy == "lru":
+            del self._lru[key]
+            return
+
+        bucket = self._lfu[entry.freq]
+        del bucket[key]
 
-    def get(self, node: object) -> object or None:
-        try:
-            return self._cache[node.make_identity()]
-        except KeyError:
-            return None
+        if not bucket:
+            del self._lfu[entry.freq]
 
-    def save(self, node: object):
-        key = self.make_key(node)
-        self._cache[key] = node
+            if self._lfu_min == entry.freq and self._lfu:
+                self._lfu_min = min(self._lfu)
 
 
 __all__ = ("MemoryGraphNodeCache",)
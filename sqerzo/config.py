@@ -16,6 +16,9 @@ class _SQErzoConfig(dict):
         self["SUPPORTED_TYPES"]: List[str] = []
         self["SETUP_OBJECTS"]: List[Type] = []
 
+        # Legacy SHA-512 identities by default. See graph/identity.py
+        self["IDENTITY_STRATEGY"]: str = "sha512"
+
 SQErzoConfig = _SQErzoConfig()
 
 __all__ = ("SQErzoConfig",)
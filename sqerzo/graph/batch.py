@@ -0,0 +1,140 @@
+import threading
+
+from collections import deque
+
+
+class AdaptiveBatchSize:
+    """
+    Number of elements written by each transaction chunk, tuned with the
+    latency observed when chunks are written.
+
+    - **size**: initial chunk size.
+    - **min_size** / **max_size**: bounds of the chunk size.
+    - **target_latency**: seconds a chunk should take to be written. While
+      full chunks are written faster, the size grows. Slower chunks shrink
+      it proportionally.
+    - **max_bytes**: max approximated payload size of a chunk. Chunks are
+      written when they reach it, even if they have less than 'size'
+      elements, and the size is reduced to the elements that fit.
+
+    Timeouts and payload errors of the DB engine halve the size. Set
+    min_size == max_size for a fixed chunk size.
+
+    Chosen sizes and counters are available in stats().
+    """
+
+    GROWTH = 1.5
+
+    def __init__(self,
+                 size: int = 1000,
+                 min_size: int = 100,
+                 max_size: int = 10000,
+                 target_latency: float = 1.0,
+                 max_bytes: int = None,
+                 history: int = 100):
+
+        if not 0 < min_size <= max_size:
+            raise ValueError(
+                f"Invalid batch bounds: min={min_size}, max={max_size}"
+            )
+
+        if target_latency <= 0:
+            raise ValueError(f"Invalid batch latency: {target_latency}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+
+        self.initial_size = self._bound(size)
+        self.size = self.initial_size
+
+        self.chunks = 0
+        self.elements = 0
+        self.grows = 0
+        self.shrinks = 0
+        self.errors = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+
+        # Size chosen after each written chunk
+        self.history = deque([self.size], maxlen=history)
+
+        self._lock = threading.Lock()
+
+    def is_full(self, elements: int, payload_bytes: int) -> bool:
+        if elements >= self.size:
+            return True
+
+        return bool(self.max_bytes and payload_bytes >= self.max_bytes)
+
+    def record(self, elements: int, payload_bytes: int, latency: float):
+        """Update the size with a chunk written in 'latency' seconds"""
+        if not elements:
+            return
+
+        with self._lock:
+            self.chunks += 1
+            self.elements += elements
+            self.last_latency = latency
+            self.total_latency += latency
+
+            if self.max_bytes and payload_bytes >= self.max_bytes \
+                    and elements < self.size:
+                # Elements are wider than expected
+                self._resize(elements)
+
+            elif latency > self.target_latency:
+                self._resize(
+                    int(self.size * self.target_latency / latency)
+                )
+
+            elif elements >= self.size:
+                # Only full chunks tell us that bigger ones are fast enough
+                self._resize(int(self.size * self.GROWTH))
+
+            self.history.append(self.size)
+
+    def failed(self):
+        """A chunk failed by a timeout or by its payload size"""
+        with self._lock:
+            self.errors += 1
+            self._resize(self.size // 2)
+            self.history.append(self.size)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "chunks": self.chunks,
+            "elements": self.elements,
+            "grows": self.grows,
+            "shrinks": self.shrinks,
+            "errors": self.errors,
+            "last_latency": self.last_latency,
+            "avg_latency": self.total_latency / self.chunks
+            if self.chunks else None,
+            "history": list(self.history)
+        }
+
+    def _bound(self, size: int) -> int:
+        return max(self.min_size, min(self.max_size, size))
+
+    def _resize(self, size: int):
+        size = self._bound(size)
+
+        if size > self.size:
+            self.grows += 1
+        elif size < self.size:
+            self.shrinks += 1
+
+        self.size = size
+
+
+def payload_size(values: list) -> int:
+    """Approximated size of a row of query parameters, in bytes"""
+    return sum(len(v) if type(v) is str else 8 for v in values)
+
+
+__all__ = ("AdaptiveBatchSize", "payload_size")
@@ -1,34 +1,384 @@
 from __future__ import annotations
 
 import abc
+import urllib.parse as pr
 
-from typing import List, Iterable, Type
+from typing import List, Iterable, Type, Tuple, AsyncIterable, Callable
+from collections import defaultdict
 
-from ..model import GraphElement
-from .lang import create_query, prepare_params
+from ..model import GraphElement, GraphNode, GraphEdge
+from ..batch import AdaptiveBatchSize
+from .lang import create_query, prepare_params, node_properties, \
+    encode_value, node_changes, update_query, update_batch_query
 from ...exceptions import SQErzoElementExistException, SQErzoException
-from ..interfaces import SQErzoGraphConnection, ResultElement
+from ..interfaces import SQErzoGraphConnection, ResultElement, \
+    check_projection
+
+
+class NodesPager:
+    """
+    Builds the queries to fetch nodes in pages of 'page_size' nodes, so only
+    one page is in memory at the same time. If 'page_size' is None, all nodes
+    are fetched in one query.
+
+    Without 'order_by', pages are ordered by 'identity' and each page
+    starts after the last identity of the previous one (keyset
+    pagination). With 'order_by', pages are fetched with SKIP / LIMIT.
+    Use '-' prefix for descending order. Example: order_by="-age"
+
+    Usage: call next_page() to get the next query and its params and
+    map_result() for each result row, until next_page() returns None.
+    """
+
+    def __init__(self,
+                 node_type: Type[GraphElement] or GraphElement,
+                 page_size: int = None,
+                 skip: int = None,
+                 limit: int = None,
+                 order_by: str = None,
+                 filters: dict = None):
+
+        #
+        # Detect if 'node_type' is and object instance or a class definition
+        #
+        if isinstance(node_type, type):
+            # Is a class definition
+            self.labels = ":".join(node_type.__labels__)
+            self.class_constructor = node_type
+        else:
+
+            # Is an object instance
+            if not issubclass(type(node_type), GraphElement):
+                raise SQErzoException(
+                    "'node_type' must be 'GraphElement' subclass"
+                )
+
+            self.labels = node_type.labels()
+            self.class_constructor = node_type.__class__
+
+        self.filters, self.params = prepare_params(filters, operation="insert")
+
+        if order_by:
+            order_field = order_by.lstrip("-")
+
+            if not order_field.isidentifier():
+                raise SQErzoException(f"Invalid order_by value: '{order_by}'")
+
+            self.order = f"a.{order_field}" \
+                         f"{' DESC' if order_by[0] == '-' else ''}"
+        else:
+            self.order = None
+
+        self.page_size = page_size
+        self.keyset = bool(page_size and not self.order)
+        self.skip = skip or 0
+        self.remaining = limit
+
+        self._page_limit = None
+        self._count = None
+        self._last_identity = ""
+
+    def next_page(self) -> Tuple[str, dict] or None:
+
+        #
+        # Was previous page the last one?
+        #
+        if self._count is not None:
+            if not self.page_size or self._count < self._page_limit:
+                return None
+
+            if self.remaining is not None:
+                self.remaining -= self._count
+
+            if self.keyset:
+                self.skip = 0
+            else:
+                self.skip += self._count
+
+        page_limit = self.page_size
+
+        if self.remaining is not None:
+            page_limit = min(self.page_size or self.remaining, self.remaining)
+
+            if page_limit <= 0:
+                return None
+
+        params = dict(self.params)
+
+        if self.keyset:
+            params["page_after"] = self._last_identity
+            where = "WHERE a.identity > $page_after"
+            order_clause = "ORDER BY a.identity"
+        else:
+            where = ""
+            order_clause = f"ORDER BY {self.order}, a.identity" \
+                if self.order else ""
+
+        if self.skip:
+            params["page_skip"] = self.skip
+
+        if page_limit is not None:
+            params["page_limit"] = page_limit
+
+        query = f"""
+        MATCH (a:{self.labels} {{ {', '.join(self.filters)} }})
+        {where}
+        RETURN a
+        {order_clause}
+        {"SKIP $page_skip" if self.skip else ""}
+        {"LIMIT $page_limit" if page_limit is not None else ""}
+        """
+
+        self._page_limit = page_limit
+        self._count = 0
+
+        return query, params
+
+    def map_result(self, res: List[ResultElement]) \
+            -> GraphElement or List[GraphElement]:
+        self._count += 1
+
+        if self.keyset:
+            self._last_identity = res[0].properties["identity"]
+
+        yield_values = [
+            self.class_constructor.from_query_results(r)
+            for r in res
+        ]
+
+        if len(yield_values) > 1:
+            return yield_values
+        else:
+            return yield_values[0]
+
+
+class CypherServerTransaction(metaclass=abc.ABCMeta):
+    """
+    DB engine transaction. Queries sent by query() are applied together by
+    commit() or discarded by rollback(). After commit() or rollback(), the
+    transaction can't be used again.
+    """
+
+    @abc.abstractmethod
+    def query(self, query: str, **kwargs) -> None or object:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def commit(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def rollback(self):
+        raise NotImplementedError()
+
+
+class AsyncCypherServerTransaction(metaclass=abc.ABCMeta):
+    """asyncio version of CypherServerTransaction"""
+
+    @abc.abstractmethod
+    async def query(self, query: str, **kwargs) -> None or object:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def commit(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def rollback(self):
+        raise NotImplementedError()
 
 
 class CypherSQErzoGraphConnection(SQErzoGraphConnection):
 
+    # Default transaction chunk size and its bounds. DB engines adjust them
+    BATCH_SIZE = 1000
+    BATCH_MIN = 100
+    BATCH_MAX = 10000
+    BATCH_LATENCY = 1.0
+    BATCH_MAX_BYTES = 8 * 1024 * 1024
+
     def plain_string(self, text: str) -> str:
         return text.replace("-", "_").replace(":", "_").lower()
 
     def labels_to_name(self, labels: List[str]) -> str:
         return "_".join(l.replace(":", "_") for l in labels)
 
-    def get_node_by_id(self, node_id: str) \
-            -> GraphElement or None:
+    def match_labels(self, labels: Iterable[str] = None) -> str:
+        """Labels filter for a MATCH clause. Matching by label allows DB
+        engines to use 'identity' indexes, created for each label"""
+        if not labels:
+            return ""
 
-        if not node_id:
-            return
+        return f":{':'.join(sorted(labels))}"
+
+    def get_node_by_id_query(self,
+                             node_id: str,
+                             labels: Iterable[str] = None) -> Tuple[str, dict]:
+        q = f"""
+        MATCH (n{self.match_labels(labels)} {{ identity: $identity }})
+        RETURN n
+        """
+        return q, {"identity": node_id}
 
+    def get_nodes_by_ids_query(self,
+                               node_ids: List[str],
+                               labels: Iterable[str] = None) \
+            -> Tuple[str, dict]:
         q = f"""
-        MATCH (n {{ identity: '{node_id}' }})
+        UNWIND $ids AS node_id
+        MATCH (n{self.match_labels(labels)} {{ identity: node_id }})
         RETURN n
         """
-        if result := self.query_response(q):
+        return q, {"ids": list(node_ids)}
+
+    def get_or_create_query(self,
+                            graph_element: GraphElement,
+                            return_node: bool = True) -> Tuple[str, dict]:
+        """
+        Nodes are merged by their identity and, if they are created, their
+        properties are set. Edges are merged by their identity and their
+        source and destination nodes, that must exist.
+        """
+        if isinstance(graph_element, GraphNode):
+            properties = node_properties(graph_element)
+            identity = properties.pop("identity")
+
+            props, params = prepare_params(
+                properties, operation="update", node_name="n"
+            )
+            params["n_identity"] = identity
+
+            q = f"""
+            MERGE (n:{graph_element.labels()} {{ identity: $n_identity }})
+            {f"ON CREATE SET {', '.join(props)}" if props else ""}
+            {"RETURN n" if return_node else ""}
+            """
+
+        else:
+            q = f"""
+            MATCH (from:{graph_element.source.labels()} {{ identity: $identity_from }})
+            MATCH (to:{graph_element.destination.labels()} {{ identity: $identity_to }})
+            MERGE (from)-[:{graph_element.labels()} {{ identity: $identity_edge }}]->(to)
+            """
+            params = {
+                "identity_from": graph_element.source.make_identity(),
+                "identity_to": graph_element.destination.make_identity(),
+                "identity_edge": graph_element.make_identity()
+            }
+
+        return q, params
+
+    def delete_query(self,
+                     graph_element: GraphElement,
+                     detach: bool = True) -> Tuple[str, dict]:
+        if isinstance(graph_element, GraphNode):
+            q = f"""
+            MATCH (n{self.match_labels(graph_element.__labels__)} {{ identity: $identity }})
+            {"DETACH DELETE" if detach else "DELETE"} n
+            """
+        else:
+            q = f"""
+            MATCH ()-[n:{graph_element.labels()} {{ identity: $identity }}]->()
+            DELETE n
+            """
+
+        return q, {"identity": graph_element.make_identity()}
+
+    def delete_chunk_query(self,
+                           element_type: Type[GraphElement] = None,
+                           filters: dict = None,
+                           detach: bool = True) -> Tuple[str, dict]:
+        """
+        Deletes up to $chunk_size elements of 'element_type' that match
+        with 'filters'. Without 'element_type', any node matches.
+        """
+        props, params = prepare_params(filters, node_name="n")
+        props = f"{{ {', '.join(props)} }}" if props else ""
+
+        if element_type is None:
+            pattern = f"(n {props})"
+        elif issubclass(element_type, GraphEdge):
+            pattern = f"()-[n{self.match_labels(element_type.__labels__)} {props}]->()"
+            detach = False
+        else:
+            pattern = f"(n{self.match_labels(element_type.__labels__)} {props})"
+
+        q = f"""
+        MATCH {pattern}
+        WITH n LIMIT $chunk_size
+        {"DETACH DELETE" if detach else "DELETE"} n
+        """
+
+        return q, params
+
+    def delete_element(self,
+                       graph_element: GraphElement,
+                       detach: bool = True) -> bool:
+        """Returns False if the element doesn't exist"""
+        q, params = self.delete_query(graph_element, detach)
+
+        nodes, relationships = self.deleted_counters(self.query(q, **params))
+
+        if isinstance(graph_element, GraphNode):
+            return bool(nodes)
+        else:
+            return bool(relationships)
+
+    def delete_elements(self,
+                        element_type: Type[GraphElement] = None,
+                        filters: dict = None,
+                        batch_size: int = None,
+                        detach: bool = True,
+                        progress: Callable[[int], None] = None) -> int:
+        """
+        Delete elements in chunks of 'batch_size' (default: DB engine
+        batch_size), one query for each chunk, so big deletes don't run out
+        of DB memory nor lock the graph for long. 'progress' is called after
+        each chunk with the number of elements deleted so far.
+
+        Returns the number of deleted elements.
+        """
+        q, params = self.delete_chunk_query(element_type, filters, detach)
+        params["chunk_size"] = chunk_size = batch_size or self.batch_size
+
+        is_edge = element_type is not None and \
+            issubclass(element_type, GraphEdge)
+
+        total = 0
+
+        while True:
+            nodes, relationships = self.deleted_counters(
+                self.query(q, **params)
+            )
+            deleted = relationships if is_edge else nodes
+
+            if not deleted:
+                break
+
+            total += deleted
+
+            if progress:
+                progress(total)
+
+            if deleted < chunk_size:
+                break
+
+        return total
+
+    def deleted_counters(self, summary: object) -> Tuple[int, int]:
+        """Nodes and relationships deleted by a query, from the value
+        returned by query()"""
+        raise NotImplementedError()
+
+    def get_node_by_id(self, node_id: str, labels: Iterable[str] = None) \
+            -> GraphElement or None:
+
+        if not node_id:
+            return
+
+        q, params = self.get_node_by_id_query(node_id, labels)
+
+        if result := self.query_response(q, **params):
             for res in result:
                 if type(res) is list:
                     return res[0]
@@ -36,77 +386,402 @@ class CypherSQErzoGraphConnection(SQErzoGraphConnection):
                 else:
                     return res
 
+    def get_nodes_by_ids(self,
+                         node_ids: List[str],
+                         labels: Iterable[str] = None) \
+            -> Iterable[ResultElement]:
+
+        if not node_ids:
+            return
+
+        q, params = self.get_nodes_by_ids_query(node_ids, labels)
+
+        with self.query_response(q, **params) as responses:
+            for res in responses:
+                yield res[0]
+
     def save_element(self, graph_element: GraphElement) \
             -> None or SQErzoElementExistException:
 
-        self.query(create_query(graph_element))
+        q, params = create_query(graph_element)
 
-    def update_element(self, graph_element: GraphElement) \
-            -> None or SQErzoElementExistException:
+        self.query(q, **params)
 
-        self.query(graph_element.query_update())
+    def update_elements_queries(self,
+                                graph_elements: Iterable[GraphElement]) \
+            -> Iterable[Tuple[str, dict, List[GraphElement]]]:
+        """
+        Nodes with the same labels, changed properties and added labels are
+        updated together, with one query for each 'batch_size' nodes.
+        Unchanged nodes are skipped.
+
+        Yields queries, their params and the nodes they update.
+        """
+        # (labels, properties names, added labels) -> [(row, node)]
+        groups = defaultdict(list)
+
+        for node in graph_elements:
+            changes, added_labels = node_changes(node)
+
+            if not changes and not added_labels:
+                continue
+
+            names = tuple(sorted(changes))
+            row = [
+                node.make_identity(),
+                *(encode_value(changes[name]) for name in names)
+            ]
+
+            groups[(":".join(sorted(node.__labels__)), names, added_labels)]\
+                .append((row, node))
+
+        chunk_size = self.batch_size
+
+        for (labels, names, added_labels), rows in groups.items():
+            q = update_batch_query(labels, names, added_labels)
+
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i:i + chunk_size]
+
+                yield q, {"batch": [row for row, _ in chunk]}, \
+                    [node for _, node in chunk]
+
+    def update_element(self, graph_element: GraphElement) -> bool:
+        """Only changed properties and added labels are written. If
+        nothing changed, DB is not queried and False is returned"""
+        if not (update := update_query(graph_element)):
+            return False
+
+        q, params = update
+        self.query(q, **params)
+
+        graph_element.clear_dirty()
+
+        return True
 
-        graph_element.__dirty_properties__.clear()
+    def update_elements(self, graph_elements: Iterable[GraphElement]) \
+            -> List[GraphElement]:
+        """Returns updated elements"""
+        updated = []
+
+        for q, params, nodes in self.update_elements_queries(graph_elements):
+            self.query(q, **params)
+
+            for node in nodes:
+                node.clear_dirty()
+
+            updated.extend(nodes)
+
+        return updated
+
+    def get_or_create_element(self, graph_element: GraphElement) \
+            -> ResultElement or None:
+        """Returns the stored node. Nothing is returned for edges"""
+        q, params = self.get_or_create_query(graph_element)
+
+        if not isinstance(graph_element, GraphNode):
+            self.query(q, **params)
+            return
+
+        with self.query_response(q, **params) as responses:
+            for res in responses:
+                return res[0]
 
     def fetch_nodes(self,
                     node_type: Type[GraphElement] or GraphElement,
-                    **kwargs) \
+                    filters: dict = None,
+                    page_size: int = None,
+                    skip: int = None,
+                    limit: int = None,
+                    order_by: str = None) \
             -> Iterable[GraphElement] or SQErzoException:
+        """See NodesPager for pagination parameters"""
+        pager = NodesPager(node_type, page_size, skip, limit, order_by, filters)
 
-        #
-        # Detect if 'node_type' is and object instance or a class definition
-        #
-        if "__module__" in node_type.__dict__:
-            # Is a class definition
-            labels = ":".join(node_type.__labels__)
-            class_constructor = node_type
-        else:
+        while page := pager.next_page():
+            query, params = page
 
-            # Is an object instance
-            if not issubclass(type(node_type), GraphElement):
-                raise SQErzoException(
-                    "'node_type' must be 'GraphElement' subclass"
-                )
+            with self.query_response(query, **params) as responses:
 
-            labels = node_type.labels()
-            class_constructor = node_type.__class__
+                for res in responses:
+                    yield pager.map_result(res)
 
-        tmp_prop = " and ".join(
-            prepare_params(kwargs, operation="insert")
-        )
+    @property
+    def batch_size(self) -> int:
+        return self.batch_sizer.initial_size
 
-        query = f"""
-        MATCH (a:{labels} {{ {tmp_prop} }})
-        RETURN a
+    @property
+    def transaction_class(self) -> Type:
+        from .transaction import CypherSQErzoTransaction
+
+        return CypherSQErzoTransaction
+
+    def truncate(self,
+                 batch_size: int = None,
+                 progress: Callable[[int], None] = None) -> int:
+        return self.delete_elements(batch_size=batch_size, progress=progress)
+
+    def begin_transaction(self) -> CypherServerTransaction:
+        raise NotImplementedError()
+
+    def query_projection(self,
+                         query: str,
+                         projection: str = "tuple",
+                         **kwargs) -> Iterable[tuple or dict]:
+        """query_response() with rows as tuples, or dicts, of column
+        values. Useful for queries that return properties, not nodes"""
+        response = self.query_response(query, **kwargs)
+        response.projection = check_projection(projection)
+
+        return response
+
+    def is_batch_size_error(self, error: Exception) -> bool:
+        """True if a chunk write failed by a timeout or by its payload
+        size, so next chunks must be smaller"""
+        return isinstance(error, TimeoutError)
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        """True if a query failed by a transient error, like a deadlock,
+        and it can be sent again as is"""
+        return False
+
+    def _setup_batch_sizer(self, cs: str) -> AdaptiveBatchSize:
         """
+        Transaction chunk size is configured by connection string query
+        parameters. Defaults depend on the DB engine:
 
-        with self.query_response(query) as responses:
+        - batch_size: initial chunk size
+        - batch_min / batch_max: bounds of the chunk size
+        - batch_latency: target seconds to write a chunk
+        - batch_max_bytes: max approximated payload size of a chunk
 
-            for res in responses:
+        Example: neo4j://127.0.0.1:7687/?batch_min=500&batch_max=50000
+        """
+        qs = dict(pr.parse_qsl(pr.urlparse(cs).query))
 
-                yield_values = []
-                for r in res:
-                    yield_values.append(
-                        class_constructor.from_query_results(r)
-                    )
-                # yield class_constructor.from_query_results(res)
+        try:
+            return AdaptiveBatchSize(
+                size=int(qs.get("batch_size", self.BATCH_SIZE)),
+                min_size=int(qs.get("batch_min", self.BATCH_MIN)),
+                max_size=int(qs.get("batch_max", self.BATCH_MAX)),
+                target_latency=float(
+                    qs.get("batch_latency", self.BATCH_LATENCY)
+                ),
+                max_bytes=int(
+                    qs.get("batch_max_bytes", self.BATCH_MAX_BYTES)
+                ) or None
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid batch config: {e}")
 
-                if len(yield_values) > 1:
-                    yield yield_values
-                else:
-                    yield yield_values[0]
+
+class AsyncCypherSQErzoGraphConnection(metaclass=abc.ABCMeta):
+    """
+    asyncio version of CypherSQErzoGraphConnection.
+
+    Queries are built by the sync connection of the same DB engine, so sync
+    and async APIs share the same Cypher generation, indexes and constraints
+    setup. Subclasses only implement how queries are sent.
+    """
+
+    def __init__(self, sync_connection: CypherSQErzoGraphConnection):
+        self.sync = sync_connection
+
+    @abc.abstractmethod
+    async def query(self, query: str, **kwargs) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def query_response(self, query: str, **kwargs) \
+            -> AsyncIterable[List[ResultElement]]:
+        """Returns an async context manager that is async iterable"""
+        raise NotImplementedError()
 
     @property
     def batch_size(self) -> int:
-        return 1000
+        return self.sync.batch_size
+
+    @property
+    def batch_sizer(self) -> AdaptiveBatchSize:
+        return self.sync.batch_sizer
+
+    def is_batch_size_error(self, error: Exception) -> bool:
+        return self.sync.is_batch_size_error(error)
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        return self.sync.is_retryable_error(error)
 
     @property
     def transaction_class(self) -> Type:
-        from .transaction import CypherSQErzoTransaction
+        from .transaction import AsyncCypherSQErzoTransaction
 
-        return CypherSQErzoTransaction
+        return AsyncCypherSQErzoTransaction
+
+    async def get_node_by_id(self,
+                             node_id: str,
+                             labels: Iterable[str] = None) \
+            -> GraphElement or None:
+
+        if not node_id:
+            return
+
+        q, params = self.sync.get_node_by_id_query(node_id, labels)
+
+        async with self.query_response(q, **params) as responses:
+            async for res in responses:
+                return res[0]
+
+    async def get_nodes_by_ids(self,
+                               node_ids: List[str],
+                               labels: Iterable[str] = None) \
+            -> AsyncIterable[ResultElement]:
+
+        if not node_ids:
+            return
+
+        q, params = self.sync.get_nodes_by_ids_query(node_ids, labels)
+
+        async with self.query_response(q, **params) as responses:
+            async for res in responses:
+                yield res[0]
+
+    async def save_element(self, graph_element: GraphElement) \
+            -> None or SQErzoElementExistException:
+
+        q, params = create_query(graph_element)
+
+        await self.query(q, **params)
+
+    async def update_element(self, graph_element: GraphElement) -> bool:
+        if not (update := update_query(graph_element)):
+            return False
+
+        q, params = update
+        await self.query(q, **params)
+
+        graph_element.clear_dirty()
+
+        return True
+
+    async def update_elements(self,
+                              graph_elements: Iterable[GraphElement]) \
+            -> List[GraphElement]:
+        updated = []
+
+        for q, params, nodes in self.sync.update_elements_queries(
+                graph_elements
+        ):
+            await self.query(q, **params)
+
+            for node in nodes:
+                node.clear_dirty()
+
+            updated.extend(nodes)
+
+        return updated
+
+    async def get_or_create_element(self, graph_element: GraphElement) \
+            -> ResultElement or None:
+        q, params = self.sync.get_or_create_query(graph_element)
+
+        if not isinstance(graph_element, GraphNode):
+            await self.query(q, **params)
+            return
+
+        async with self.query_response(q, **params) as responses:
+            async for res in responses:
+                return res[0]
+
+    async def fetch_nodes(self,
+                          node_type: Type[GraphElement] or GraphElement,
+                          filters: dict = None,
+                          page_size: int = None,
+                          skip: int = None,
+                          limit: int = None,
+                          order_by: str = None) \
+            -> AsyncIterable[GraphElement] or SQErzoException:
+        """See NodesPager for pagination parameters"""
+        pager = NodesPager(node_type, page_size, skip, limit, order_by, filters)
+
+        while page := pager.next_page():
+            query, params = page
+
+            async with self.query_response(query, **params) as responses:
+
+                async for res in responses:
+                    yield pager.map_result(res)
+
+    async def delete_element(self,
+                             graph_element: GraphElement,
+                             detach: bool = True) -> bool:
+        q, params = self.sync.delete_query(graph_element, detach)
+
+        nodes, relationships = self.sync.deleted_counters(
+            await self.query(q, **params)
+        )
+
+        if isinstance(graph_element, GraphNode):
+            return bool(nodes)
+        else:
+            return bool(relationships)
+
+    async def delete_elements(self,
+                              element_type: Type[GraphElement] = None,
+                              filters: dict = None,
+                              batch_size: int = None,
+                              detach: bool = True,
+                              progress: Callable[[int], None] = None) -> int:
+        """See CypherSQErzoGraphConnection.delete_elements"""
+        q, params = self.sync.delete_chunk_query(element_type, filters, detach)
+        params["chunk_size"] = chunk_size = batch_size or self.batch_size
+
+        is_edge = element_type is not None and \
+            issubclass(element_type, GraphEdge)
+
+        total = 0
+
+        while True:
+            nodes, relationships = self.sync.deleted_counters(
+                await self.query(q, **params)
+            )
+            deleted = relationships if is_edge else nodes
+
+            if not deleted:
+                break
+
+            total += deleted
+
+            if progress:
+                progress(total)
+
+            if deleted < chunk_size:
+                break
+
+        return total
+
+    async def truncate(self,
+                       batch_size: int = None,
+                       progress: Callable[[int], None] = None) -> int:
+        return await self.delete_elements(
+            batch_size=batch_size, progress=progress
+        )
+
+    async def begin_transaction(self) -> AsyncCypherServerTransaction:
+        raise NotImplementedError()
+
+    def query_projection(self,
+                         query: str,
+                         projection: str = "tuple",
+                         **kwargs) -> AsyncIterable[tuple or dict]:
+        response = self.query_response(query, **kwargs)
+        response.projection = check_projection(projection)
+
+        return response
+
+    async def close(self):
+        pass
 
-    def truncate(self):
-        self.query("match (p) detach delete p")
 
-__all__ = ("CypherSQErzoGraphConnection", "ResultElement")
+__all__ = ("CypherSQErzoGraphConnection", "ResultElement", "NodesPager",
+           "AsyncCypherSQErzoGraphConnection", "CypherServerTransaction",
+           "AsyncCypherServerTransaction")
@@ -2,74 +2,337 @@
 # -------------------------------------------------------------------------
 # Utils
 # -------------------------------------------------------------------------
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Tuple, Callable
 
 from ...config import SQErzoConfig
+from ...exceptions import SQErzoException
+from ..helpers import instance_items
+from ..model import DirtyDict
 
-def scape_string(text: str):
-    return text.replace("""\\""", """\\\\""").replace("'", """\\'""")
+# Types that are checked by class in compiled serializers. Datetimes are
+# always adapted by encode_value()
+_FAST_TYPES = {
+    "str": str, "int": int, "float": float, "bool": bool
+}
 
-def prepare_params(values: dict, operation="insert", node_name="a") -> List[str]:
-    """Operation values: [insert|query|update]"""
+def encode_value(value: object) -> object:
+    """Adapt a Python value to a type supported by the DB engine as query
+    parameter. Not supported types are sent as strings"""
+    if value is None:
+        return value
+
+    type_name = value.__class__.__name__
+
+    if type_name not in SQErzoConfig.SUPPORTED_TYPES:
+        return str(value)
+
+    if type_name == "datetime":
+        return encode_datetime(value)
+
+    return value
+
+def encode_datetime(value: datetime) -> datetime:
+    """
+    Datetimes are stored as they were by inlined 'datetime(...)' literals,
+    so they can be compared with the existing ones: zoned DateTime values,
+    with a fixed UTC offset and seconds precision. Naive datetimes are UTC.
+
+    A naive datetime parameter would be stored as a LocalDateTime instead.
+    """
+    offset = value.utcoffset()
+
+    return value.replace(
+        microsecond=0,
+        tzinfo=timezone.utc if offset is None else timezone(offset)
+    )
+
+def prepare_params(values: dict, operation="insert", node_name="a") \
+        -> Tuple[List[str], dict]:
+    """Operation values: [insert|query|update]
+
+    Values are never inlined into the query text. Instead, this function
+    returns the query fragments, that reference Cypher parameters, and the
+    parameters map. Parameter names are prefixed with the node name, so the
+    query text is the same for all elements with the same properties and DB
+    Engines can reuse their query plan caches.
+    """
 
     if not values:
-        return []
+        return [], {}
 
     if operation == "insert":
         op = ":"
         nn = ""
     else:
         nn = f"{node_name}."
-        op = ":"
+        op = " ="
 
     ret = []
     ret_append = ret.append
+    params = {}
 
     for k, v in values.items():
-        type_v = v.__class__.__name__
+        param_name = f"{node_name}_{k}"
+
+        ret_append(f"{nn}{k}{op} ${param_name}")
+        params[param_name] = encode_value(v)
+
+    return ret, params
+
+
+
+def node_properties(node) -> dict:
+    """Properties of a node that are stored in the DB, including its
+    identity"""
+
+    if not node.identity:
+        node.identity = node.make_identity()
+
+        # Do not include in dirty properties
+        node.clear_dirty("identity")
+
+    values = {"identity": node.identity}
+    values.update(node.properties.items())
+    values.update(
+        (k, v)
+        for k, v in instance_items(node)
+        if
+        k not in ("properties", "identity") and not k.startswith("_")
+    )
+
+    return values
+
+
+class ElementSerializer:
+    """
+    Serializer of a GraphElement class, compiled for the types supported by
+    the DB engine.
+
+    'keys' are the stored properties: 'identity' and the class '__fields__'.
+    values() returns their encoded values in the same order. It's a function
+    generated for the class, so it doesn't walk the element attributes nor
+    dispatch on type names for values of their annotated type.
+
+    Elements with entries in 'properties' or with attributes that are not
+    class fields can't use it: values() returns None for them and
+    node_properties() must be used instead.
+    """
+
+    def __init__(self, cls, supported_types: Tuple[str]):
+        self.keys = ("identity", *cls.__fields__)
+        self.values = self._compile(cls, supported_types)
 
-        if type_v == "str" and type_v in SQErzoConfig.SUPPORTED_TYPES:
-            o = f"{nn}{k}{op} '{scape_string(v)}'"
+        # node name -> (query fragments, params names)
+        self._templates = {}
 
-        elif type_v == "datetime" and type_v in SQErzoConfig.SUPPORTED_TYPES:
-            tm = v.strftime("%Y-%m-%dT%H:%M:%S%z")
-            o = f"{nn}{k}{op} datetime('{tm}')"
+    def insert_template(self, node_name: str) -> Tuple[str, Tuple[str]]:
+        try:
+            return self._templates[node_name]
+        except KeyError:
+            names = tuple(f"{node_name}_{k}" for k in self.keys)
+            fragments = ", ".join(
+                f"{k}: ${name}" for k, name in zip(self.keys, names)
+            )
 
-        elif type_v == "bool" and type_v in SQErzoConfig.SUPPORTED_TYPES:
-            o = f"{nn}{k}{op} {'true' if v else 'false'}"
+            self._templates[node_name] = template = (fragments, names)
 
-        elif type_v == ("int", "float") and type_v in SQErzoConfig.SUPPORTED_TYPES:
-            o = f"{nn}{k}{op} {v}"
+            return template
+
+    def _compile(self, cls, supported_types: Tuple[str]) -> Callable:
+        fields = cls.__fields__
+        namespace = {"encode_value": encode_value, "make_identity": _identity}
+
+        code = ["def values(element):"]
+
+        if cls.__slotted__:
+            # Slotted elements can't have other attributes
+            code += [
+                "    for _ in element.properties.items():",
+                "        return None",
+                *(f"    v{i} = element.{f}" for i, f in enumerate(fields)),
+            ]
         else:
-            o = f"{nn}{k}{op} '{scape_string(str(v))}'"
+            # Fields + identity + properties + __is_instance__. Dirty
+            # tracking attributes are not counted
+            code += [
+                "    d = element.__dict__",
+                "    if len(d) - ('__dirty_properties__' in d) "
+                f"- ('__added_labels__' in d) != {len(fields) + 3}:",
+                "        return None",
+                "    for _ in element.properties.items():",
+                "        return None",
+                "    try:",
+                *(f"        v{i} = d[{f!r}]" for i, f in enumerate(fields)),
+                "    except KeyError:",
+                "        return None",
+            ]
 
-        ret_append(o)
+        code += [
+            "    return [",
+            "        element.identity or make_identity(element),"
+        ]
 
-    return ret
+        for i, f in enumerate(fields):
+            type_name = _annotation_name(cls, f)
 
+            if type_name in supported_types and type_name in _FAST_TYPES:
+                namespace[f"T{i}"] = _FAST_TYPES[type_name]
+                code.append(
+                    f"        v{i} if v{i} is None or v{i}.__class__ is T{i} "
+                    f"else encode_value(v{i}),"
+                )
+            else:
+                code.append(f"        encode_value(v{i}),")
 
+        code.append("    ]")
 
-def create_query(node, partial: bool = False):
+        exec("\n".join(code), namespace)
 
-    if not node.identity:
-        node.identity = node.make_identity()
+        return namespace["values"]
 
-        # Do not include in dirty properties
-        del node.__dirty_properties__["identity"]
+
+def _annotation_name(cls, field: str) -> str or None:
+    for m in cls.mro():
+        if field in (annotations := m.__dict__.get("__annotations__", {})):
+            annotation = annotations[field]
+
+            if type(annotation) is str:
+                return annotation
+
+            return getattr(annotation, "__name__", None)
+
+
+def _identity(node) -> str:
+    node.identity = node.make_identity()
+
+    # Do not include in dirty properties
+    node.clear_dirty("identity")
+
+    return node.identity
+
+
+def get_serializer(cls) -> ElementSerializer or None:
+    """Serializer of a GraphElement class for the current DB engine"""
+    try:
+        serializers = cls.__serializers__
+    except AttributeError:
+        # GraphNode and GraphEdge base classes
+        return None
+
+    supported_types = tuple(SQErzoConfig.SUPPORTED_TYPES)
+
+    try:
+        return serializers[supported_types]
+    except KeyError:
+        serializers[supported_types] = serializer = \
+            ElementSerializer(cls, supported_types)
+
+        return serializer
+
+
+def node_row(node) -> Tuple[Tuple[str], list]:
+    """Stored properties names of a node and their encoded values"""
+    if serializer := get_serializer(node.__class__):
+        if (values := serializer.values(node)) is not None:
+            return serializer.keys, values
+
+    properties = node_properties(node)
+
+    return (
+        tuple(properties.keys()),
+        [encode_value(v) for v in properties.values()]
+    )
+
+
+def node_changes(node) -> Tuple[dict, Tuple[str]]:
+    """Stored properties of a node changed since its creation or its last
+    update, and the labels added to it"""
+    changes = {}
+
+    if isinstance(properties := node.properties, DirtyDict):
+        for k in properties.dirty_keys():
+            if not k.startswith("_") and k in properties:
+                changes[k] = properties[k]
+
+    fields = getattr(node.__class__, "__fields__", ())
+
+    for k in node.dirty_properties():
+        if k in fields:
+            changes[k] = getattr(node, k, None)
+
+    labels = tuple(node.dirty_labels())
+
+    if labels and not SQErzoConfig.SUPPORTED_MULTIPLE_LABELS:
+        raise SQErzoException(
+            f"DB engine doesn't support multiple labels. Can't add: {labels}"
+        )
+
+    return changes, labels
+
+
+def update_query(node, node_name: str = "n") -> Tuple[str, dict] or None:
+    """SET only changed properties and added labels. None if nothing
+    changed"""
+    changes, labels = node_changes(node)
+
+    if not changes and not labels:
+        return None
+
+    sets, params = prepare_params(
+        changes, operation="update", node_name=node_name
+    )
+    sets.extend(f"{node_name}:{label}" for label in labels)
+
+    params[f"{node_name}_identity"] = node.make_identity()
+
+    q = f"""
+    MATCH ({node_name}:{':'.join(node.__labels__)} {{ identity: ${node_name}_identity }})
+    SET {', '.join(sets)}
+    """
+
+    return q, params
+
+
+def update_batch_query(labels: str,
+                       properties: Tuple[str],
+                       added_labels: Tuple[str]) -> str:
+    """Updates a batch of nodes with the same labels, changed properties
+    and added labels. Rows: [identity, *properties values]"""
+    sets = [
+        *(f"n.{name} = row[{i}]" for i, name in enumerate(properties, 1)),
+        *(f"n:{label}" for label in added_labels)
+    ]
+
+    return f"""
+    UNWIND $batch as row
+    MATCH (n:{labels} {{ identity: row[0] }})
+    SET {', '.join(sets)}
+    """
+
+
+def create_query(node, partial: bool = False, node_name: str = "n") \
+        -> Tuple[str, dict]:
 
     labels = node.labels()
 
-    tmp_prop = [f"identity: '{node.identity}'"]
-    tmp_prop.extend(prepare_params(node.properties))
-    tmp_prop.extend(prepare_params({
-        k: v
-        for k, v in node.__dict__.items()
-        if
-        k not in ("properties", "identity") and not k.startswith("_")
-    }))
+    if serializer := get_serializer(node.__class__):
+        if (values := serializer.values(node)) is not None:
+            fragments, names = serializer.insert_template(node_name)
+
+            return f"{'' if partial else 'CREATE '} (:{labels} {{{fragments}}})", \
+                dict(zip(names, values))
+
+    tmp_prop, params = prepare_params(
+        node_properties(node),
+        node_name=node_name
+    )
 
     prop = f"{{{', '.join(tmp_prop)}}}"
 
-    return f"{'' if partial else 'CREATE '} (:{labels} {prop})"
+    return f"{'' if partial else 'CREATE '} (:{labels} {prop})", params
 
-__all__ = ("create_query", )
+__all__ = ("create_query", "prepare_params", "encode_value", "encode_datetime",
+           "node_properties", "node_row", "get_serializer",
+           "ElementSerializer", "node_changes", "update_query",
+           "update_batch_query")
@@ -1,15 +1,41 @@
 import redis
+import asyncio
+import functools
 import urllib.parse as pr
 
-from typing import Iterable, List, Type, Tuple
+from typing import Iterable, List, Type, Tuple, AsyncIterable, Callable
 
 from redisgraph import Graph
+from redisgraph.node import Node
+from redisgraph.edge import Edge
+from redisgraph.util import stringify_param_value
 
 from ...exceptions import *
 from ..model import GraphElement, GraphNode
 from .transaction import CypherSQErzoTransaction
-from .interfaces import ResultElement, CypherSQErzoGraphConnection
-from ..interfaces import SQErzoQueryResponse, SQErzoGraphConnection
+from .interfaces import ResultElement, CypherSQErzoGraphConnection, \
+    AsyncCypherSQErzoGraphConnection, CypherServerTransaction, \
+    AsyncCypherServerTransaction
+from ..interfaces import SQErzoQueryResponse, SQErzoGraphConnection, \
+    LazyResultElement
+
+
+class RedisResultElement(LazyResultElement):
+
+    @property
+    def id(self) -> int:
+        return self.element.id
+
+    @property
+    def labels(self) -> List[str]:
+        if isinstance(self.element, Node):
+            return list(self.element.labels or ())
+        else:
+            return [self.element.relation]
+
+    @property
+    def properties(self) -> dict:
+        return self.element.properties
 
 
 class RedisGraphSQErzoQueryResponse(SQErzoQueryResponse):
@@ -19,31 +45,70 @@ class RedisGraphSQErzoQueryResponse(SQErzoQueryResponse):
         self.graph = graph
         self.params = kwargs
 
+    def wrap_value(self, value: object, alias: str) -> object:
+        if isinstance(value, (Node, Edge)):
+            return RedisResultElement(value, alias)
+
+        return value
+
     def __iter__(self):
         query_results = self.graph.connection.query(self.query, self.params)
 
-        for res in query_results.result_set:
+        row = self.row_mapper([
+            alias.decode() if isinstance(alias, bytes) else alias
+            for _, alias in query_results.header
+        ])
 
-            yield [
-                    ResultElement(
-                        id=node.id,
-                        alias=query_results.header[i][1].decode(),
-                        labels=list(node.label),
-                        properties=node.properties
-                    )
-                for i, node in enumerate(res)
-            ]
+        for values in query_results.result_set:
+            yield row(values)
+
+
+class RedisServerTransaction(CypherServerTransaction):
+    """
+    Queries are queued in a MULTI / EXEC pipeline and sent at commit. Redis
+    runs them one after another, without queries of other clients between
+    them, and nothing is written if commit isn't reached.
+
+    Redis doesn't roll back: if a query fails at commit, the previous ones
+    keep their changes. Queries are kept in memory until commit.
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.pipeline = graph.redis_con.pipeline(transaction=True)
+
+    def query(self, query: str, **kwargs) -> None:
+        self.pipeline.execute_command(
+            "GRAPH.QUERY",
+            self.graph.name,
+            params_header(kwargs) + query if kwargs else query,
+            "--compact"
+        )
+
+    def commit(self):
+        try:
+            self.pipeline.execute()
+        finally:
+            self.pipeline.reset()
+
+    def rollback(self):
+        self.pipeline.reset()
+
+
+def params_header(params: dict) -> str:
+    """'CYPHER name=value ...' header that sends query parameters to
+    RedisGraph, as Graph.query() builds it"""
+    return "CYPHER " + "".join(
+        f"{name}={stringify_param_value(value)} "
+        for name, value in params.items()
+    )
 
 
 class RedisSQErzoTransaction(CypherSQErzoTransaction):
     SUPPORTED_TYPES = ("str", "int", "float", "bool")
 
-    def dump_data(self,
-                  partial_query_nodes: dict,
-                  partial_edged: dict):
-        if partial_query_nodes:
-            node_query = f"CREATE {', '.join(partial_query_nodes.values())}"
-            self.graph.db_engine.query(node_query)
+    def edge_queries(self,
+                     partial_edged: dict) -> Iterable[Tuple[str, dict]]:
 
         #
         # Get al Edges
@@ -73,77 +138,82 @@ class RedisSQErzoTransaction(CypherSQErzoTransaction):
             UNWIND $batch as row
             MATCH (from:{edge.source.labels()} {{ identity: row[0] }})
             MATCH (to:{edge.destination.labels()} {{ identity: row[1] }})
-            CREATE (from)-[:{edge.labels()} {{ identity: row[2] }}]->(to)
+            {self.edge_clause} (from)-[:{edge.labels()} {{ identity: row[2] }}]->(to)
             """
 
-            self.graph.db_engine.query(q, batch=batch)
+            yield q, {"batch": batch}
 
 
 class RedisSQErzoGraphConnection(CypherSQErzoGraphConnection):
 
+    # RedisGraph blocks the graph while a query is written -> small chunks
+    BATCH_MAX = 5000
+    BATCH_LATENCY = 0.5
+
     def __init__(self, connection_string: str):
+        self.connection_string = connection_string
         self.connection = self._parse_connection_string(
             connection_string
         )
+        self.batch_sizer = self._setup_batch_sizer(connection_string)
 
-    def update_element(self, graph_element: GraphElement) \
+    def save_element(self, graph_element: GraphElement) \
             -> None or SQErzoElementExistException:
-        """Redis doesn't support multiple labels -> we'll simulate then"""
-
-        def update_fixed_label_nodes(n) -> Iterable[Tuple[bool, GraphElement]]:
-            if len(n.__labels__) > 1:
-                #
-                # If multiple labels are not supported, then create
-                # net node clone with only new labels
-                #
-                for lb in n.__labels__[1:]:
-                    new_node = n.clone(exclude=["identity"])
-                    new_node.__labels__ = [lb]
-
-                    yield True, new_node
-
-            else:
-                yield False, n
-
-        if not graph_element:
-            raise SQErzoElementExistException("Node update needs a valid Node")
+        """
+        RedisGraph doesn't support constraints. Nodes are saved with a
+        MERGE on their identity, in one query, and query statistics tell us
+        if the node already existed
+        """
+        if not isinstance(graph_element, GraphNode):
+            super(RedisSQErzoGraphConnection, self).save_element(graph_element)
+            return
+
+        q, params = self.get_or_create_query(
+            graph_element, return_node=False
+        )
 
-        for need_create, n in update_fixed_label_nodes(graph_element):
+        if not self.connection.query(q, params).nodes_created:
+            raise SQErzoElementExistException(
+                f"Graph element with id '{graph_element.identity}' "
+                f"already exits"
+            )
 
-            # No multiple labels supported. Need to be created a new node
-            if need_create:
-                q = n.query_create()
+    @property
+    def transaction_class(self) -> Type:
+        return RedisSQErzoTransaction
 
-            # Multiple labels supported -> update node
-            else:
-                q = n.query_update()
+    @property
+    def async_connection_class(self) -> Type:
+        return AsyncRedisSQErzoGraphConnection
 
-            self.query(q)
+    def query(self, query: str, **kwargs):
+        return self.connection.query(query, kwargs)
 
-            n.__dirty_properties__.clear()
+    def deleted_counters(self, summary: object) -> Tuple[int, int]:
+        return summary.nodes_deleted, summary.relationships_deleted
 
-    def save_element(self, graph_element: GraphElement) \
-            -> None or SQErzoElementExistException:
+    def begin_transaction(self) -> RedisServerTransaction:
+        return RedisServerTransaction(self.connection)
 
-        node_id = graph_element.make_identity()
+    def query_response(self, query: str, **kwargs) -> Iterable[ResultElement]:
+        return RedisGraphSQErzoQueryResponse(self, query, **kwargs)
 
-        if isinstance(graph_element, GraphNode):
-            if self.get_node_by_id(node_id):
-                raise SQErzoElementExistException(
-                    f"Graph element with id '{node_id}' already exits"
-                )
+    def is_batch_size_error(self, error: Exception) -> bool:
+        if isinstance(error, redis.exceptions.TimeoutError):
+            return True
 
-        super(RedisSQErzoGraphConnection, self).save_element(graph_element)
+        if isinstance(error, redis.exceptions.ResponseError):
+            msg = str(error).lower()
 
-    @property
-    def transaction_class(self) -> Type:
-        return RedisSQErzoTransaction
+            return "timed out" in msg or "mem consumption" in msg
 
-    def query(self, query: str, **kwargs):
-        self.connection.query(query, kwargs)
+        return super(
+            RedisSQErzoGraphConnection, self
+        ).is_batch_size_error(error)
 
-    def query_response(self, query: str, **kwargs) -> Iterable[ResultElement]:
-        return RedisGraphSQErzoQueryResponse(self, query, **kwargs)
+    def is_retryable_error(self, error: Exception) -> bool:
+        # RedisGraph runs write queries one by one: there are no deadlocks
+        return isinstance(error, redis.exceptions.BusyLoadingError)
 
     def create_constraints_nodes(self, key: str, labels: List[str]):
         """Redis doesn't support constraints -> do nothing"""
@@ -177,15 +247,7 @@ class RedisSQErzoGraphConnection(CypherSQErzoGraphConnection):
         else:
             db = 0
 
-        if parsed.query:
-            qp = parsed.query.split("&", maxsplit=1)[0]
-            p_name, p_value = qp.split("=")
-            if p_name != "graph":
-                db_graph = "sqerzo"
-            else:
-                db_graph = p_value
-        else:
-            db_graph = "sqerzo"
+        db_graph = dict(pr.parse_qsl(parsed.query)).get("graph", "sqerzo")
 
         port = parsed.port
         if port is None:
@@ -201,4 +263,83 @@ class RedisSQErzoGraphConnection(CypherSQErzoGraphConnection):
 
         return Graph(db_graph, r)
 
-__all__ = ("RedisSQErzoGraphConnection",)
+class AsyncRedisGraphSQErzoQueryResponse(SQErzoQueryResponse):
+
+    def __init__(self, graph: SQErzoGraphConnection, query: str, **kwargs):
+        self.query = query
+        self.graph = graph
+        self.params = kwargs
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def __aiter__(self):
+        #
+        # RedisGraph returns all results in one response, so they are
+        # recovered at once
+        #
+        response = self.graph.sync.query_response(self.query, **self.params)
+        response.projection = self.projection
+
+        results = await self.graph.run_sync(lambda: list(response))
+
+        for res in results:
+            yield res
+
+
+class AsyncRedisServerTransaction(AsyncCypherServerTransaction):
+    """asyncio version of RedisServerTransaction. Queries are queued in
+    memory, so only commit() waits for Redis"""
+
+    def __init__(self, connection: AsyncCypherSQErzoGraphConnection):
+        self.connection = connection
+        self.sync = connection.sync.begin_transaction()
+
+    async def query(self, query: str, **kwargs) -> None:
+        self.sync.query(query, **kwargs)
+
+    async def commit(self):
+        await self.connection.run_sync(self.sync.commit)
+
+    async def rollback(self):
+        self.sync.rollback()
+
+
+class AsyncRedisSQErzoGraphConnection(AsyncCypherSQErzoGraphConnection):
+    """
+    redisgraph client doesn't support asyncio. Queries are sent by the sync
+    connection from the event loop thread pool, so they don't block the
+    event loop.
+    """
+
+    async def run_sync(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(
+            None,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def query(self, query: str, **kwargs):
+        return await self.run_sync(self.sync.query, query, **kwargs)
+
+    def query_response(self, query: str, **kwargs) \
+            -> AsyncIterable[List[ResultElement]]:
+        return AsyncRedisGraphSQErzoQueryResponse(self, query, **kwargs)
+
+    async def save_element(self, graph_element: GraphElement) \
+            -> None or SQErzoElementExistException:
+        await self.run_sync(self.sync.save_element, graph_element)
+
+    async def update_element(self, graph_element: GraphElement) -> bool:
+        return await self.run_sync(self.sync.update_element, graph_element)
+
+    async def begin_transaction(self) -> AsyncRedisServerTransaction:
+        return AsyncRedisServerTransaction(self)
+
+
+__all__ = ("RedisSQErzoGraphConnection", "AsyncRedisSQErzoGraphConnection",
+           "RedisServerTransaction", "AsyncRedisServerTransaction")
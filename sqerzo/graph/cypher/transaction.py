@@ -1,26 +1,377 @@
-from collections import defaultdict
+from __future__ import annotations
 
-from .lang import create_query
+import time
+import queue
+import logging
+import random
+import asyncio
+import threading
+
+from typing import List, Tuple, Iterable
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from .lang import node_row
+from ...cache.bloom import IdentityBloomFilter
+from ..batch import AdaptiveBatchSize, payload_size
 from ..transaction import SQErzoTransaction
+from ...exceptions import SQErzoException
 from ..model import GraphElement, GraphNode, GraphEdge
 
+log = logging.getLogger("sqerzo")
+
+_TRANSACTION_MODES = ("create", "upsert")
+
+@dataclass
+class TransactionChunk:
+    """
+    Elements of a transaction that are written to the DB together.
+
+    Nodes are grouped by labels and properties names:
+    (labels, properties names) -> [ [property values] ]
+
+    'merge_rows' are grouped the same way: rows of nodes that may have been
+    written by a previous chunk, so they are merged instead of created.
+
+    'identities' are the identities of the nodes added to the chunk, so a
+    node added twice is written once. 'bytes' is the approximated size of
+    the query parameters.
+    """
+    node_rows: dict = field(default_factory=lambda: defaultdict(list))
+    merge_rows: dict = field(default_factory=lambda: defaultdict(list))
+    edges: dict = field(default_factory=lambda: defaultdict(list))
+    nodes: list = field(default_factory=list)
+    identities: set = field(default_factory=set)
+    size: int = 0
+    bytes: int = 0
+
+    def split(self, size: int) -> List[TransactionChunk]:
+        """Chunks of, at most, 'size' elements with the elements of this
+        chunk. Nodes come first, so they are written before edges"""
+        nodes = {n.identity: n for n in self.nodes}
+        chunks = [TransactionChunk()]
+
+        def free_chunk() -> TransactionChunk:
+            if chunks[-1].size >= size:
+                chunks.append(TransactionChunk())
+
+            return chunks[-1]
+
+        for name in ("node_rows", "merge_rows"):
+            for (labels, keys), rows in getattr(self, name).items():
+                identity = keys.index("identity")
+
+                for row in rows:
+                    chunk = free_chunk()
+                    getattr(chunk, name)[(labels, keys)].append(row)
+                    chunk.nodes.append(nodes[row[identity]])
+                    chunk.identities.add(row[identity])
+                    chunk.bytes += payload_size(row)
+                    chunk.size += 1
+
+        for key, edges in self.edges.items():
+            for edge in edges:
+                chunk = free_chunk()
+                chunk.edges[key].append(edge)
+                chunk.bytes += edge_payload_size(edge)
+                chunk.size += 1
+
+        return chunks
+
+
+def edge_payload_size(edge: GraphEdge) -> int:
+    return payload_size([
+        edge.source.make_identity(),
+        edge.destination.make_identity(),
+        edge.make_identity()
+    ])
+
+
+def split_failed_chunk(chunk: TransactionChunk,
+                       batch_sizer: AdaptiveBatchSize) \
+        -> List[TransactionChunk]:
+    """
+    Smaller chunks with the elements of a chunk that failed by a timeout or
+    by its payload size, after 'batch_sizer' reduced its size. Chunks that
+    already have 'batch_sizer.min_size' elements, or less, can't be split:
+    an empty list is returned.
+    """
+    if chunk.size <= batch_sizer.min_size:
+        return []
+
+    size = max(
+        batch_sizer.min_size, min(batch_sizer.size, (chunk.size + 1) // 2)
+    )
+
+    return chunk.split(size)
+
+
 class CypherSQErzoTransaction(SQErzoTransaction):
+    """
+    Elements added to a transaction are written in chunks. Chunk size is
+    adapted to the latency observed by the DB engine 'batch_sizer'.
+
+    A chunk is written by add() when it's full and released, so memory is
+    bounded by the chunk size. commit() writes the last chunk. Nodes added
+    twice to the same chunk are written once. In create mode, identities of
+    the nodes of previous chunks are kept in a Bloom filter of fixed size,
+    'WRITTEN_CAPACITY': nodes found in it are merged by their identity,
+    instead of created, so they aren't duplicated.
+
+    With 'background' enabled, full chunks are queued instead and a
+    background thread writes them. The queue holds, at most, 'queue_size'
+    chunks: when it's full, add() waits for the writer thread. Writer
+    errors are raised at commit.
+
+    Each chunk is written in its own DB engine transaction, and if it
+    fails, previous chunks stay written. On Neo4j, a chunk is written
+    completely or not at all. RedisGraph transactions (MULTI / EXEC) don't
+    roll back: if a query of a chunk fails, the previous queries of the
+    chunk keep their changes. With 'atomic' enabled, all chunks are written
+    in one DB engine transaction, committed by commit(). If commit fails,
+    or the 'with' block raises, nothing is written, with the same
+    RedisGraph exception. Nodes are added to the cache and to
+    'known_identities' after the commit.
+
+    'mode' sets how elements are written:
+
+    - create: elements are created. Existing elements are duplicated or,
+      if DB engine has constraints, the commit fails.
+    - upsert: nodes are merged by their identity, built from their
+      '__keys__', and their properties are updated. Edges are merged by
+      identity and their source and destination nodes. Replaying a
+      transaction doesn't duplicate data.
+
+    If the graph has 'known_identities', written nodes are added to it
+    and, in create mode, nodes found in it are skipped, as they were
+    written before.
+
+    Chunks that fail by transient errors, like deadlocks or leader
+    switches, are rolled back and written again up to 'retries' times,
+    waiting an exponential backoff between tries. Chunks that fail by a
+    timeout or by their payload size are split in smaller chunks, of the
+    size reduced by 'batch_sizer', and written again, until they have
+    'batch_sizer.min_size' elements. A failed chunk aborts atomic
+    transactions, so they aren't retried nor split.
+    """
+
+    # Seconds to wait before the first retry. It doubles in each retry
+    RETRY_WAIT = 0.1
+
+    # Expected nodes, and false positive rate, of the Bloom filter of
+    # written nodes. A false positive only merges a new node
+    WRITTEN_CAPACITY = 1000000
+    WRITTEN_ERROR_RATE = 0.001
+
+    def __init__(self,
+                 graph,
+                 background: bool = False,
+                 queue_size: int = 4,
+                 mode: str = "create",
+                 retries: int = 5,
+                 atomic: bool = False):
+        if mode not in _TRANSACTION_MODES:
+            raise ValueError(
+                f"Invalid transaction mode '{mode}'. "
+                f"Valid values: {_TRANSACTION_MODES}"
+            )
 
-    def __init__(self, graph):
         self.graph = graph
-        self._commit = []
+        self.background = background
+        self.queue_size = queue_size
+        self.mode = mode
+        self.retries = retries
+        self.retried = 0
+        self.atomic = atomic
+
+        self._chunk = TransactionChunk()
+        self._queue = None
+        self._writer = None
+        self._writer_error = None
+
+        # Atomic transactions: DB engine transaction and identities of the
+        # nodes written in it
+        self._server_tx = None
+        self._uncommitted = set()
+
+        # Nodes added to previous chunks. Created with the first node
+        self._written = None
 
     def add(self, element: GraphElement):
-        self._commit.append(element)
+        if self.background and self._writer is None:
+            self._start_writer()
 
+        self.add_to_chunk(self._chunk, element)
 
-    def dump_data(self,
-                  partial_query_nodes: dict,
-                  partial_edged: dict):
+        if not self.graph.db_engine.batch_sizer.is_full(
+                self._chunk.size, self._chunk.bytes
+        ):
+            return
+
+        chunk, self._chunk = self._chunk, TransactionChunk()
+
+        if self.background:
+            self._queue.put(chunk)
+        else:
+            self.write_chunk(chunk)
+
+    def add_to_chunk(self, chunk: TransactionChunk, element: GraphElement):
+
+        if isinstance(element, GraphNode):
+            key = element.make_identity()
+
+            if key in chunk.identities or key in self._uncommitted:
+                return
+
+            chunk.identities.add(key)
+
+            rows = chunk.node_rows
+
+            # Upserts of known nodes update their properties
+            if self.mode == "create":
+                if (known := self.graph.known_identities) is not None \
+                        and key in known:
+                    known.skipped += 1
+                    return
+
+                if self.atomic:
+                    pass
+
+                elif self._written is None:
+                    self._written = IdentityBloomFilter(
+                        self.WRITTEN_CAPACITY, self.WRITTEN_ERROR_RATE
+                    )
+                    self._written.add(key)
+
+                elif key in self._written:
+                    rows = chunk.merge_rows
+
+                else:
+                    self._written.add(key)
+
+            keys, row = node_row(element)
+            labels = ":".join(sorted(element.labels().split(":")))
+
+            rows[(labels, keys)].append(row)
+            chunk.nodes.append(element)
+            chunk.bytes += payload_size(row)
+
+        elif isinstance(element, GraphEdge):
+            label_edge = element.labels()
+            label_source = element.source.labels()
+            label_destination = element.destination.labels()
+            key = f"{label_source}#{label_edge}#{label_destination}"
+
+            chunk.edges[key].append(element)
+            chunk.bytes += edge_payload_size(element)
+
+        chunk.size += 1
+
+    def write_chunk(self, chunk: TransactionChunk):
+        if not chunk.size:
+            return
+
+        db_engine = self.graph.db_engine
+        start = time.monotonic()
+
+        try:
+            self.dump_data(chunk.node_rows, chunk.edges, chunk.merge_rows)
+        except Exception as e:
+            if not db_engine.is_batch_size_error(e):
+                raise
+
+            db_engine.batch_sizer.failed()
+
+            # Queries of atomic transactions can't be sent again
+            if self.atomic or not (
+                    chunks := split_failed_chunk(chunk, db_engine.batch_sizer)
+            ):
+                raise
+
+            for smaller in chunks:
+                self.write_chunk(smaller)
+
+            return
+
+        db_engine.batch_sizer.record(
+            chunk.size, chunk.bytes, time.monotonic() - start
+        )
+
+        if self.atomic:
+            # Nodes don't exist for other clients until commit
+            self._uncommitted.update(chunk.identities)
+            return
+
+        self.graph.cache.write(chunk.nodes)
+
+        if (known := self.graph.known_identities) is not None:
+            known.update(n.identity for n in chunk.nodes)
+
+    @property
+    def edge_clause(self) -> str:
+        """Cypher clause that writes edges"""
+        return "MERGE" if self.mode == "upsert" else "CREATE"
+
+    def chunk_queries(self,
+                      partial_query_nodes: dict,
+                      partial_edged: dict,
+                      partial_merge_nodes: dict = None) \
+            -> Iterable[Tuple[str, dict]]:
+        """Queries, and their params, that write a chunk of elements"""
+        yield from self.node_queries(partial_query_nodes)
+
+        if partial_merge_nodes:
+            yield from self.node_queries(partial_merge_nodes, merge=True)
+
+        yield from self.edge_queries(partial_edged)
+
+    def node_queries(self,
+                     partial_query_nodes: dict,
+                     merge: bool = False) -> Iterable[Tuple[str, dict]]:
+        """
+        One query for each group of nodes with the same labels and
+        properties. Query text only depends on the group, so DB engines
+        parse it once and reuse its plan for every chunk.
+
+        Upserts, and create transactions with 'merge', merge nodes by their
+        identity. Merged nodes of create transactions keep the properties
+        they were created with.
+
+        We use indexed data batch, instead of dict, because not all DB
+        Engines support list of dict, but all supports indexed data
+        """
+        for (labels, properties), rows in partial_query_nodes.items():
+
+            if merge or self.mode == "upsert":
+                identity = properties.index("identity")
+                props = ", ".join(
+                    f"n.{name} = row[{i}]"
+                    for i, name in enumerate(properties)
+                    if i != identity
+                )
+                clause = "SET" if self.mode == "upsert" else "ON CREATE SET"
+
+                q = f"""
+                UNWIND $batch as row
+                MERGE (n:{labels} {{ identity: row[{identity}] }})
+                {f"{clause} {props}" if props else ""}
+                """
+
+            else:
+                props = ", ".join(
+                    f"{name}: row[{i}]"
+                    for i, name in enumerate(properties)
+                )
+
+                q = f"""
+                UNWIND $batch as row
+                CREATE (:{labels} {{ {props} }})
+                """
 
-        if partial_query_nodes:
-            node_query = f"CREATE {', '.join(partial_query_nodes.values())}"
-            self.graph.db_engine.query(node_query)
+            yield q, {"batch": rows}
+
+    def edge_queries(self,
+                     partial_edged: dict) -> Iterable[Tuple[str, dict]]:
 
         #
         # Get al Edges
@@ -46,70 +397,324 @@ class CypherSQErzoTransaction(SQErzoTransaction):
             UNWIND $batch as row
             MATCH (from:{edge.source.labels()} {{ identity: row.identity_from }})
             MATCH (to:{edge.destination.labels()} {{ identity: row.identity_to }})
-            CREATE (from)-[:{edge.labels()} {{ identity: row.identity_edge }}]->(to)
+            {self.edge_clause} (from)-[:{edge.labels()} {{ identity: row.identity_edge }}]->(to)
             """
 
-            self.graph.db_engine.query(q, batch=batch)
+            yield q, {"batch": batch}
+
+    def dump_data(self,
+                  partial_query_nodes: dict,
+                  partial_edged: dict,
+                  partial_merge_nodes: dict = None):
+        """Write a chunk in its own DB engine transaction or, for atomic
+        transactions, in the transaction of all chunks"""
+        db_engine = self.graph.db_engine
+
+        if self.atomic:
+            if self._server_tx is None:
+                self._server_tx = db_engine.begin_transaction()
+
+            for q, params in self.chunk_queries(partial_query_nodes,
+                                                partial_edged,
+                                                partial_merge_nodes):
+                self._server_tx.query(q, **params)
+
+            return
+
+        attempt = 0
+
+        while True:
+            server_tx = None
+
+            try:
+                # Starting a transaction fails by leader switches too
+                server_tx = db_engine.begin_transaction()
 
+                for q, params in self.chunk_queries(partial_query_nodes,
+                                                    partial_edged,
+                                                    partial_merge_nodes):
+                    server_tx.query(q, **params)
+
+                server_tx.commit()
+
+                return
+
+            except Exception as e:
+                if server_tx is not None:
+                    rollback(server_tx)
+
+                if attempt >= self.retries \
+                        or not db_engine.is_retryable_error(e):
+                    raise
+
+            time.sleep(retry_wait(self.RETRY_WAIT, attempt))
+
+            attempt += 1
+            self.retried += 1
 
     def commit(self):
+        try:
+            if self.background:
+                self._stop_writer()
+            else:
+                # Check if there are some remain data to dump
+                chunk, self._chunk = self._chunk, TransactionChunk()
+                self.write_chunk(chunk)
 
-        counter = 0
-        processed = 0
-        partial_query_nodes = {}
-        partial_query_nodes_processed = set()
-        partial_edges = defaultdict(list)
-        chunk_size = self.graph.db_engine.batch_size
+        except BaseException:
+            if self.atomic:
+                self.rollback()
 
-        #
-        # Get all nodes and create the query
-        #
-        # Use this approach instead of a function that split list in chunks
-        # to avoid the memory of the chunked list, the creation of
-        # a new list and scroll through the list 2 times. For big commit
-        # list it should be a problem.
-        #
-        while self._commit:
+            raise
 
-            element = self._commit.pop()
+        if self._server_tx is None:
+            return
 
-            if isinstance(element, GraphNode):
-                key = "".join(getattr(element, x) for x in element.__keys__)
+        server_tx, self._server_tx = self._server_tx, None
+        identities, self._uncommitted = self._uncommitted, set()
 
-                if key in partial_query_nodes_processed:
-                    continue
+        server_tx.commit()
 
-                partial_query_nodes_processed.add(key)
-                partial_query_nodes[key] = create_query(element, partial=True)
+        # Cache entries of the nodes, written by other clients, are stale
+        self.graph.cache.delete_ids(identities)
 
-            elif isinstance(element, GraphEdge):
-                label_edge = element.labels()
-                label_source = element.source.labels()
-                label_destination = element.destination.labels()
-                key = f"{label_source}#{label_edge}#{label_destination}"
+        if (known := self.graph.known_identities) is not None:
+            known.update(identities)
 
-                partial_edges[key].append(element)
+    def rollback(self):
+        """Discard the elements not written yet. In atomic transactions,
+        written elements are discarded too"""
+        if self.background:
+            self._stop_writer(flush=False)
 
-            counter += 1
-            processed += 1
+        self._chunk = TransactionChunk()
+        self._uncommitted = set()
 
-            if counter >= chunk_size:
-                self.dump_data(partial_query_nodes, partial_edges)
+        if self._server_tx is not None:
+            server_tx, self._server_tx = self._server_tx, None
+            server_tx.rollback()
 
-                #
-                # Reset
-                #
-                counter = 0
-                partial_edges.clear()  # Reset list
-                partial_query_nodes.clear()  # Reset list
+    # -------------------------------------------------------------------------
+    # Background writer
+    # -------------------------------------------------------------------------
+    def _start_writer(self):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._writer_error = None
+        self._writer = threading.Thread(
+            target=self._write_chunks,
+            name="sqerzo-transaction-writer",
+            daemon=True
+        )
+        self._writer.start()
 
-        # Check if there are some remain data to dump
-        self.dump_data(partial_query_nodes, partial_edges)
+    def _stop_writer(self, flush: bool = True):
+        if self._writer is None:
+            return
+
+        # Remaining elements & end signal
+        if flush:
+            self._queue.put(self._chunk)
+        else:
+            # Queued chunks are drained, not written
+            self._writer_error = self._writer_error or SQErzoException(
+                "Transaction rolled back"
+            )
+
+        self._queue.put(None)
+        self._writer.join()
+
+        self._chunk = TransactionChunk()
+        self._writer = None
+
+        error, self._writer_error = self._writer_error, None
+
+        if error is not None and flush:
+            raise error
+
+    def _write_chunks(self):
+        while (chunk := self._queue.get()) is not None:
+
+            # After an error, drain the queue to not block producer
+            if self._writer_error is not None:
+                continue
+
+            try:
+                self.write_chunk(chunk)
+            except Exception as e:
+                self._writer_error = e
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.commit()
+        if exc_type is not None and self.atomic:
+            self.rollback()
+        else:
+            self.commit()
+
+class AsyncCypherSQErzoTransaction:
+    """
+    asyncio version of CypherSQErzoTransaction:
+
+        async with graph.transaction() as tx:
+            await tx.write(node)
+
+    add() can't wait for the DB engine: elements are grouped in chunks and
+    full chunks are kept in memory until commit. write() adds an element
+    and writes the chunks that are full, so only one chunk is kept in
+    memory.
+
+    Chunks and their queries are built by the sync transaction class of the
+    DB engine, so both write the same queries.
+    """
+
+    RETRY_WAIT = CypherSQErzoTransaction.RETRY_WAIT
+
+    def __init__(self, graph, mode: str = "create", retries: int = 5):
+        if mode not in _TRANSACTION_MODES:
+            raise ValueError(
+                f"Invalid transaction mode '{mode}'. "
+                f"Valid values: {_TRANSACTION_MODES}"
+            )
+
+        self.graph = graph
+        self.mode = mode
+        self.retries = retries
+        self.retried = 0
+
+        self._builder = self.graph.db_engine.sync.transaction_class(
+            self.graph, mode=self.mode
+        )
+        self._chunk = TransactionChunk()
+        self._full = deque()
+
+    def add(self, element: GraphElement):
+        self._builder.add_to_chunk(self._chunk, element)
+
+        if self.graph.db_engine.batch_sizer.is_full(
+                self._chunk.size, self._chunk.bytes
+        ):
+            self._full.append(self._chunk)
+            self._chunk = TransactionChunk()
+
+    async def write(self, element: GraphElement):
+        """Add an element and write full chunks"""
+        self.add(element)
+
+        await self.write_full_chunks()
+
+    async def write_full_chunks(self):
+        # Write chunks in the same order they were filled
+        while self._full:
+            await self.write_chunk(self._builder, self._full.popleft())
+
+    async def write_chunk(self,
+                          builder: CypherSQErzoTransaction,
+                          chunk: TransactionChunk):
+        if not chunk.size:
+            return
+
+        db_engine = self.graph.db_engine
+        start = time.monotonic()
+
+        try:
+            await self.dump_data(builder, chunk)
+        except Exception as e:
+            if not db_engine.is_batch_size_error(e):
+                raise
+
+            db_engine.batch_sizer.failed()
+
+            if not (chunks := split_failed_chunk(chunk,
+                                                 db_engine.batch_sizer)):
+                raise
+
+            for smaller in chunks:
+                await self.write_chunk(builder, smaller)
+
+            return
+
+        db_engine.batch_sizer.record(
+            chunk.size, chunk.bytes, time.monotonic() - start
+        )
+
+        cache = self.graph.cache
+        await cache.run_async(cache.write, chunk.nodes)
+
+        if (known := self.graph.known_identities) is not None:
+            known.update(n.identity for n in chunk.nodes)
+
+    async def dump_data(self,
+                        builder: CypherSQErzoTransaction,
+                        chunk: TransactionChunk):
+        """See CypherSQErzoTransaction.dump_data"""
+        db_engine = self.graph.db_engine
+        attempt = 0
+
+        while True:
+            server_tx = None
+
+            try:
+                server_tx = await db_engine.begin_transaction()
+
+                for q, params in builder.chunk_queries(chunk.node_rows,
+                                                       chunk.edges,
+                                                       chunk.merge_rows):
+                    await server_tx.query(q, **params)
+
+                await server_tx.commit()
+
+                return
+
+            except Exception as e:
+                if server_tx is not None:
+                    await async_rollback(server_tx)
+
+                if attempt >= self.retries \
+                        or not db_engine.is_retryable_error(e):
+                    raise
+
+            await asyncio.sleep(retry_wait(self.RETRY_WAIT, attempt))
+
+            attempt += 1
+            self.retried += 1
+
+    async def commit(self):
+        await self.write_full_chunks()
+
+        # Check if there are some remain data to dump
+        chunk, self._chunk = self._chunk, TransactionChunk()
+        await self.write_chunk(self._builder, chunk)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.commit()
+
+
+def rollback(server_tx):
+    """Roll back a failed chunk. Errors of the rollback are logged, so the
+    error of the chunk decides if it's retried"""
+    try:
+        server_tx.rollback()
+    except Exception as e:
+        log.warning(f"Rollback of a failed transaction chunk failed: {e}")
+
+
+async def async_rollback(server_tx):
+    """asyncio version of rollback()"""
+    try:
+        await server_tx.rollback()
+    except Exception as e:
+        log.warning(f"Rollback of a failed transaction chunk failed: {e}")
+
+
+def retry_wait(base: float, attempt: int) -> float:
+    """Exponential backoff with jitter, so clients that failed together
+    don't retry at the same time"""
+    return base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
 
-__all__ = ("CypherSQErzoTransaction",)
+__all__ = ("CypherSQErzoTransaction", "AsyncCypherSQErzoTransaction",
+           "TransactionChunk", "split_failed_chunk", "retry_wait")
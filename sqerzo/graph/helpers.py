@@ -1,7 +1,8 @@
 import uuid
 import random
+import warnings
 
-from collections import Iterable
+from typing import Iterable, Tuple
 
 
 def get_class_properties(c) -> Iterable:
@@ -13,8 +14,108 @@ def get_class_properties(c) -> Iterable:
     return props
 
 
+def get_class_fields(c, exclude: Iterable[str] = ()) -> Tuple[str]:
+    """Annotated properties of a class, in dataclass fields order. Private
+    and ClassVar properties are excluded"""
+    fields = {}
+
+    for m in reversed(c.mro()):
+        for name, annotation in m.__dict__.get("__annotations__", {}).items():
+            if name.startswith("_") or name in exclude:
+                continue
+
+            if "ClassVar" in str(annotation):
+                continue
+
+            fields[name] = None
+
+    return tuple(fields)
+
+
+def instance_items(obj) -> Iterable[Tuple[str, object]]:
+    """Attributes of an object and their values. Objects of slotted
+    classes have no '__dict__': their dataclass fields are returned"""
+    try:
+        return obj.__dict__.items()
+    except AttributeError:
+        return (
+            (name, getattr(obj, name, None))
+            for name in obj.__dataclass_fields__
+        )
+
+
+# Pagination parameters of fetch_many() and their defaults
+FETCH_PAGING = {"page_size": -1, "skip": None, "limit": None, "order_by": None}
+
+
+def fetch_filters(node_type,
+                  filters: dict or None,
+                  kwargs: dict,
+                  stacklevel: int = 3,
+                  **paging) -> Tuple[dict, dict]:
+    """
+    Property filters and pagination parameters of fetch_many() and
+    fetch_one(), from their 'filters' dict, their keyword arguments and
+    their keyword-only pagination parameters.
+
+    Pagination parameters are never property filters. Properties named as
+    a pagination parameter, like 'limit', are filtered with 'filters'.
+
+    Deprecated: without 'filters', a pagination parameter named as a
+    property of 'node_type' filters the property, as it did in previous
+    versions, and a DeprecationWarning is issued.
+    """
+    if filters is not None:
+        return {**filters, **kwargs}, paging
+
+    cls = node_type if isinstance(node_type, type) else type(node_type)
+    properties = get_class_properties(cls)
+
+    filters = dict(kwargs)
+
+    for name, value in paging.items():
+        if name not in properties or value == FETCH_PAGING[name]:
+            continue
+
+        warnings.warn(
+            f"'{name}' keyword argument filters the '{name}' property of "
+            f"'{cls.__name__}'. In future versions it'll be a pagination "
+            f"parameter: filter the property with the 'filters' dict",
+            DeprecationWarning,
+            stacklevel=stacklevel
+        )
+
+        filters[name] = value
+        paging[name] = FETCH_PAGING[name]
+
+    return filters, paging
+
+
+def fetch_one_filters(node_type,
+                      filters: dict or None,
+                      kwargs: dict,
+                      **paging) -> Tuple[dict, dict]:
+    """fetch_filters() for fetch_one(), that fetches one node"""
+    filters, paging = fetch_filters(
+        node_type, filters, kwargs, stacklevel=4, **paging
+    )
+
+    for name in ("page_size", "limit"):
+        if paging[name] != FETCH_PAGING[name]:
+            raise ValueError(
+                f"Invalid fetch_one parameter '{name}': only one node is "
+                f"fetched"
+            )
+
+    paging["limit"] = 1
+
+    return filters, paging
+
+
 guuid = lambda: uuid.uuid4().hex
 rtext = lambda: "".join(random.choice(string.ascii_letters) for _ in range(80))
 
 
-__all__ = ("get_class_properties", "guuid", "rtext")
+__all__ = ("get_class_properties", "get_class_fields", "instance_items",
+           "FETCH_PAGING", "fetch_filters", "fetch_one_filters", "guuid",
+           "rtext")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import functools
+
+from typing import Tuple
+
+from .helpers import guuid, instance_items
+
+
+class IdentityStrategy:
+    """
+    Builds the identities of nodes and edges.
+
+    Node identities are built from their labels and the values of their
+    '__keys__'. Edge identities, from their labels and the identities of
+    their source and destination nodes. Nodes that only have 'identity' as
+    key get a random identity.
+
+    Subclasses implement digest(), that maps that text to the identity.
+    """
+
+    def __init__(self):
+        # Class -> key names, in class fields order
+        self._keys = {}
+
+    def digest(self, text: str) -> str:
+        raise NotImplementedError()
+
+    def node_identity(self, node) -> str:
+        keys = self._class_keys(node.__class__)
+
+        if not keys:
+            return guuid()
+
+        values = "#".join(
+            f"{k}:{'' if (v := getattr(node, k, None)) is None else v}"
+            for k in keys
+        )
+
+        return self.digest(f"{':'.join(sorted(node.__labels__))}#{values}")
+
+    def edge_identity(self, edge) -> str:
+        return self.digest(
+            f"{':'.join(sorted(edge.__labels__))}#"
+            f"{edge.source.make_identity()}#"
+            f"{edge.destination.make_identity()}"
+        )
+
+    def _class_keys(self, cls) -> Tuple[str]:
+        try:
+            return self._keys[cls]
+        except KeyError:
+            keys = cls.__keys__ - {"identity"}
+            fields = getattr(cls, "__dataclass_fields__", {})
+
+            self._keys[cls] = ordered = (
+                *(f for f in fields if f in keys),
+                *sorted(keys - fields.keys())
+            )
+
+            return ordered
+
+
+class Sha512Identity(IdentityStrategy):
+    """
+    Legacy identities: 128 chars SHA-512 hex digests. They are built exactly
+    as in previous versions, so nodes written by them keep their identities.
+    """
+
+    def digest(self, text: str) -> str:
+        return hashlib.sha512(text.encode()).hexdigest()
+
+    def node_identity(self, node) -> str:
+        l = node.labels()
+
+        key_builders = [*node.__keys__]
+
+        if not (set(node.__keys__) - {"identity"}) and not node.identity:
+            node.identity = guuid()
+
+        q = "#".join(
+            f"{k}:{'' if v is None else v}"
+            for k, v in instance_items(node)
+            if k in key_builders
+        )
+
+        return self.digest(f"{l}#{q}")
+
+    def edge_identity(self, edge) -> str:
+        l = edge.labels()
+        n = f"{edge.source.make_identity()}#{edge.source.make_identity()}"
+
+        return self.digest(f"{l}#{n}")
+
+
+class Blake2bIdentity(IdentityStrategy):
+    """BLAKE2b digests of 'digest_size' bytes. Default: 16 bytes, 32 hex
+    chars"""
+
+    def __init__(self, digest_size: int = 16):
+        super(Blake2bIdentity, self).__init__()
+
+        self.digest_size = digest_size
+
+    def digest(self, text: str) -> str:
+        return hashlib.blake2b(
+            text.encode(), digest_size=self.digest_size
+        ).hexdigest()
+
+
+class TruncatedIdentity(IdentityStrategy):
+    """Any hashlib algorithm hex digest, truncated to 'length' chars"""
+
+    def __init__(self, hash_name: str = "sha256", length: int = 32):
+        super(TruncatedIdentity, self).__init__()
+
+        # Fail early with invalid algorithms
+        hashlib.new(hash_name)
+
+        self.hash_name = hash_name
+        self.length = length
+
+        # Named constructors are faster than hashlib.new()
+        self._hash = getattr(hashlib, hash_name, None) or \
+            functools.partial(hashlib.new, hash_name)
+
+    def digest(self, text: str) -> str:
+        return self._hash(text.encode()).hexdigest()[:self.length]
+
+
+class RawKeyIdentity(IdentityStrategy):
+    """Identity is the key text itself. Nothing is hashed, but identities
+    are as long as the key values"""
+
+    def digest(self, text: str) -> str:
+        return text
+
+
+_STRATEGIES = {
+    "sha512": Sha512Identity,
+    "blake2b": Blake2bIdentity,
+    "truncated": TruncatedIdentity,
+    "raw": RawKeyIdentity
+}
+
+_INSTANCES = {}
+
+
+def get_identity_strategy(strategy: str or IdentityStrategy) \
+        -> IdentityStrategy:
+    """Strategies are set by name: sha512, blake2b, truncated or raw. Or by
+    an IdentityStrategy instance"""
+    if isinstance(strategy, IdentityStrategy):
+        return strategy
+
+    try:
+        return _INSTANCES[strategy]
+    except KeyError:
+        pass
+
+    try:
+        _INSTANCES[strategy] = instance = _STRATEGIES[strategy]()
+    except KeyError:
+        raise ValueError(
+            f"Invalid identity strategy '{strategy}'. "
+            f"Valid values: {tuple(_STRATEGIES)}"
+        )
+
+    return instance
+
+
+__all__ = ("IdentityStrategy", "Sha512Identity", "Blake2bIdentity",
+           "TruncatedIdentity", "RawKeyIdentity", "get_identity_strategy")
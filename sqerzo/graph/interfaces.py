@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import abc
 
-from typing import List, Iterable, Type
+from typing import List, Iterable, Type, Callable, Sequence
 from dataclasses import dataclass
 
 from .model import GraphElement
@@ -17,12 +17,75 @@ class ResultElement:
     labels: List[str] = None
     properties: dict = None
 
+class LazyResultElement(ResultElement):
+    """
+    ResultElement that wraps a node or an edge of a DB engine response. Its
+    fields are decoded from 'element' when they are accessed, so unused
+    fields are never built. DB engines implement the fields as properties.
+    """
+
+    def __init__(self, element: object, alias: str = None):
+        self.element = element
+        self.alias = alias
+
+
+_PROJECTIONS = ("tuple", "dict")
+
+
+def check_projection(projection: str) -> str:
+    if projection not in _PROJECTIONS:
+        raise ValueError(
+            f"Invalid projection '{projection}'. "
+            f"Valid values: {_PROJECTIONS}"
+        )
+
+    return projection
+
+
 class SQErzoQueryResponse:
+    """
+    Iterable of the rows of a query response. By default, a row is a list
+    with a value for each column. With 'projection' set to 'tuple' or
+    'dict', rows are tuples of column values or dicts of column alias ->
+    value. In all cases, nodes and edges are ResultElement and other
+    values, like numbers or strings, are returned as they are.
+
+    'fetch_size' is the number of rows requested to the DB engine at a
+    time, if it supports it. Default: DB engine driver default.
+    """
+
+    projection = None
+    fetch_size = None
 
     @abc.abstractmethod
     def __init__(self, graph: SQErzoGraphConnection, query: str, **kwargs):
         raise NotImplementedError()
 
+    def wrap_value(self, value: object, alias: str) -> object:
+        """Column value of a row. DB engines wrap their nodes and
+        edges"""
+        return value
+
+    def row_mapper(self, aliases: Sequence[str]) -> Callable:
+        """Function that maps the column values of a row to a row of the
+        response"""
+        wrap = self.wrap_value
+
+        if self.projection == "tuple":
+            return lambda values: tuple(
+                wrap(v, a) for v, a in zip(values, aliases)
+            )
+
+        elif self.projection == "dict":
+            return lambda values: {
+                a: wrap(v, a) for v, a in zip(values, aliases)
+            }
+
+        else:
+            return lambda values: [
+                wrap(v, a) for v, a in zip(values, aliases)
+            ]
+
     def __enter__(self):
         return self
 
@@ -41,18 +104,49 @@ class SQErzoGraphConnection(metaclass=abc.ABCMeta):
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def get_node_by_id(self, node_id: str) \
+    def get_node_by_id(self, node_id: str, labels: Iterable[str] = None) \
             -> GraphElement or None:
         raise NotImplementedError()
 
+    @abc.abstractmethod
+    def get_nodes_by_ids(self,
+                         node_ids: List[str],
+                         labels: Iterable[str] = None) \
+            -> Iterable[ResultElement]:
+        raise NotImplementedError()
+
     @abc.abstractmethod
     def save_element(self, graph_element: GraphElement) \
             -> None or SQErzoElementExistException:
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def update_element(self, graph_element: GraphElement) \
-            -> None or SQErzoElementExistException:
+    def update_element(self, graph_element: GraphElement) -> bool:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def update_elements(self, graph_elements: Iterable[GraphElement]) \
+            -> List[GraphElement]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def delete_element(self,
+                       graph_element: GraphElement,
+                       detach: bool = True) -> bool:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def delete_elements(self,
+                        element_type: Type[GraphElement] = None,
+                        filters: dict = None,
+                        batch_size: int = None,
+                        detach: bool = True,
+                        progress: Callable[[int], None] = None) -> int:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def get_or_create_element(self, graph_element: GraphElement) \
+            -> ResultElement or None:
         raise NotImplementedError()
 
     @property
@@ -64,6 +158,10 @@ class SQErzoGraphConnection(metaclass=abc.ABCMeta):
     def transaction_class(self) -> Type:
         raise NotImplementedError()
 
+    @property
+    def async_connection_class(self) -> Type:
+        raise NotImplementedError()
+
     @abc.abstractmethod
     def query(self, query: str, **kwargs) -> None:
         raise NotImplementedError()
@@ -75,7 +173,11 @@ class SQErzoGraphConnection(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def fetch_nodes(self,
                     node_type: Type[GraphElement] or GraphElement,
-                    **kwargs) \
+                    filters: dict = None,
+                    page_size: int = None,
+                    skip: int = None,
+                    limit: int = None,
+                    order_by: str = None) \
             -> Iterable[GraphElement] or SQErzoException:
         raise NotImplementedError()
 
@@ -92,10 +194,12 @@ class SQErzoGraphConnection(metaclass=abc.ABCMeta):
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def truncate(self):
+    def truncate(self,
+                 batch_size: int = None,
+                 progress: Callable[[int], None] = None) -> int:
         raise NotImplementedError()
 
     def query_builder(self, graph) -> Query:
         return Query(graph)
 
-__all__ = ("ResultElement", "SQErzoGraphConnection",)
+__all__ = ("ResultElement", "LazyResultElement", "SQErzoGraphConnection",)
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import abc
-import hashlib
 import logging
+import dataclasses
 
 from typing import List
-from collections import Iterable
 from dataclasses import dataclass, field
 
+from ..config import SQErzoConfig
 from ..exceptions import SQErzoException
-from .helpers import get_class_properties, guuid
+from .helpers import get_class_properties, get_class_fields
+from .identity import IdentityStrategy, get_identity_strategy
 
 log = logging.getLogger("sqerzo")
 
@@ -18,21 +19,26 @@ class DirtyDict(dict):
     __getattr__ = dict.__getitem__
     __setattr__ = dict.__setitem__
 
-    def __init__(self, *args, **kwargs):
-        super(DirtyDict, self).__init__(*args, **kwargs)
-
-        self.__dirty_properties__ = {}
-
     def __setitem__(self, key, value):
         try:
             old_value = self.__dict__[key]
         except KeyError:
             old_value = None
 
-        self.__dirty_properties__[key] = old_value
+        # Created with the first change: most dicts are never changed
+        if (dirty := dict.get(self, "__dirty_properties__")) is None:
+            dirty = {}
+            dict.__setitem__(self, "__dirty_properties__", dirty)
+
+        dirty[key] = old_value
 
         super(DirtyDict, self).__setitem__(key, value)
 
+    def dirty_keys(self) -> List[str]:
+        return list(dict.get(self, "__dirty_properties__", ()))
+
+    def clear_dirty(self):
+        dict.pop(self, "__dirty_properties__", None)
 
     def items(self):
         for k, v in super(DirtyDict, self).items():
@@ -70,6 +76,23 @@ class GraphElementMetaClass(type):
     **__indexes__**
 
     It's an iterable value.
+
+    **__identity__**
+
+    Identity strategy of the class: a name or an IdentityStrategy. If not
+    set, SQErzoConfig.IDENTITY_STRATEGY is used.
+
+    **__fields__**
+
+    Names of the class properties stored in the DB, in class fields order,
+    without 'identity' and 'properties'. Serializers are compiled from them
+    (see cypher/lang.py) and cached in '__serializers__'.
+
+    **__slotted__**
+
+    If True, the class is converted to a dataclass with '__slots__': its
+    instances have no '__dict__' and changed fields are tracked in a bit
+    mask. These classes must not be decorated with @dataclass.
     """
 
     def __new__(cls, class_name: str, bases, dct: dict):
@@ -183,43 +206,178 @@ class GraphElementMetaClass(type):
         else:
             o.__indexes__ = {"identity"}
 
-        #
-        # Track object
-        #
-        from sqerzo.config import SQErzoConfig
+        if getattr(o, "__identity__", None) is not None:
+            o.__identity__ = get_identity_strategy(o.__identity__)
 
-        SQErzoConfig.SETUP_OBJECTS.append(o)
+        o.__fields__ = get_class_fields(o, exclude=("properties", "identity"))
+        o.__serializers__ = {}
 
         # Attack meta properties
-        o.__dirty_properties__ = {}
         o.__is_instance__ = False
 
+        if o.__slotted__:
+            o = cls._make_slotted(o)
+
+        #
+        # Track object
+        #
+        SQErzoConfig.SETUP_OBJECTS.append(o)
+
         return o
 
+    @classmethod
+    def _make_slotted(mcs, o):
+        """Like dataclass(slots=True), available since Python 3.10"""
+        o = dataclass(o)
+
+        field_names = [f.name for f in dataclasses.fields(o)]
+        inherited = {
+            s
+            for base in o.__mro__[1:]
+            for s in base.__dict__.get("__slots__", ())
+        }
+
+        dct = dict(o.__dict__)
+
+        # Defaults are kept by dataclass __init__
+        for name in field_names:
+            dct.pop(name, None)
+
+        dct.pop("__dict__", None)
+        dct.pop("__weakref__", None)
+
+        dct["__slots__"] = tuple(
+            name
+            for name in (*field_names, "__dirty_mask__", "__added_labels__")
+            if name not in inherited
+        )
+        dct["__field_bits__"] = {
+            name: 1 << i for i, name in enumerate(field_names)
+        }
+        dct["__setattr__"] = _slotted_setattr
+        dct["dirty_properties"] = _slotted_dirty_properties
+        dct["clear_dirty"] = _slotted_clear_dirty
+
+        return type.__new__(mcs, o.__name__, o.__bases__, dct)
+
     def __call__(cls, *args, **kwargs):
+        if cls.__slotted__:
+            o = cls.__new__(cls)
+
+            # Don't track fields set by __init__
+            object.__setattr__(o, "__dirty_mask__", None)
+            o.__init__(*args, **kwargs)
+            object.__setattr__(o, "__dirty_mask__", 0)
+
+            return o
+
         o = super().__call__(*args, **kwargs)
         o.__is_instance__ = True
 
         return o
 
+
+#
+# Slotted classes methods
+#
+def _slotted_setattr(self, key, value):
+    object.__setattr__(self, key, value)
+
+    # No mask while __init__ runs or while unpickling
+    if (mask := getattr(self, "__dirty_mask__", None)) is not None:
+        object.__setattr__(
+            self, "__dirty_mask__", mask | self.__field_bits__.get(key, 0)
+        )
+
+
+def _slotted_dirty_properties(self) -> List[str]:
+    mask = self.__dirty_mask__
+
+    if not mask:
+        return []
+
+    return [name for name, bit in self.__field_bits__.items() if mask & bit]
+
+
+def _slotted_clear_dirty(self, *names: str):
+    if not names:
+        object.__setattr__(self, "__dirty_mask__", 0)
+        _clear_labels_and_properties(self)
+        return
+
+    bits = self.__field_bits__
+    mask = self.__dirty_mask__ or 0
+
+    for name in names:
+        mask &= ~bits.get(name, 0)
+
+    object.__setattr__(self, "__dirty_mask__", mask)
+
+
+def _clear_labels_and_properties(element):
+    if added := getattr(element, "__added_labels__", None):
+        for label in added:
+            added[label] = False
+
+    if isinstance(properties := getattr(element, "properties", None),
+                  DirtyDict):
+        properties.clear_dirty()
+
 #
 # Base classes
 #
 class GraphElement(metaclass=GraphElementMetaClass):
+    __slots__ = ()
+    __identity__ = None
+    __slotted__ = False
 
     def __setattr__(self, key, value):
         if self.__is_instance__ and key != "__is_instance__":
+            d = self.__dict__
+
+            # Created with the first change: most elements never change
+            if (dirty := d.get("__dirty_properties__")) is None:
+                d["__dirty_properties__"] = dirty = {}
 
             # Save old value
-            self.__dirty_properties__[key] = getattr(self, key, None)
+            dirty[key] = getattr(self, key, None)
 
         super(GraphElement, self).__setattr__(key, value)
 
+    def dirty_properties(self) -> List[str]:
+        """Names of the attributes changed since creation or last clear"""
+        return list(self.__dict__.get("__dirty_properties__", ()))
+
+    def dirty_labels(self) -> List[str]:
+        """Labels added by add_label() since creation or last clear"""
+        if added := getattr(self, "__added_labels__", None):
+            return [label for label, dirty in added.items() if dirty]
+
+        return []
+
+    def clear_dirty(self, *names: str):
+        """Clear dirty attributes. Without names, clear all of them, dirty
+        labels and dirty 'properties' keys"""
+        if not names:
+            self.__dict__.pop("__dirty_properties__", None)
+            _clear_labels_and_properties(self)
+            return
+
+        if dirty := self.__dict__.get("__dirty_properties__"):
+            for name in names:
+                dirty.pop(name, None)
+
     def add_label(self, label_name: str):
-        if not label_name:
+        """Add a label to this element. It's written by the next update"""
+        if not label_name or label_name in self.__labels__:
             return
 
-        self.__labels__.add(label_name)
+        if (added := getattr(self, "__added_labels__", None)) is None:
+            added = {}
+            object.__setattr__(self, "__added_labels__", added)
+
+        # label -> is dirty
+        added.setdefault(label_name, True)
 
     @abc.abstractmethod
     def clone(self, exclude: List[str] = None) -> GraphElement:
@@ -238,11 +396,22 @@ class GraphElement(metaclass=GraphElementMetaClass):
         raise NotImplementedError()
 
     def labels(self) -> str:
+        if added := getattr(self, "__added_labels__", None):
+            return ":".join((*self.__labels__, *added))
+
         return ":".join(self.__labels__)
 
+    @classmethod
+    def identity_strategy(cls) -> IdentityStrategy:
+        return cls.__identity__ or get_identity_strategy(
+            SQErzoConfig.IDENTITY_STRATEGY
+        )
+
 
 @dataclass
 class GraphNode(GraphElement):
+    __slots__ = ()
+
     properties: DirtyDict = field(default_factory=DirtyDict)
     identity: str = None
 
@@ -252,14 +421,17 @@ class GraphNode(GraphElement):
             k:v for k, v in result_data.properties.items()
             if k not in ("identifier", "alias")
         }
+        #
+        # Properties with 'null' value are not stored by DB Engines
+        #
         custom_class_properties = {
-            k: result_data.properties[k]
+            k: result_data.properties.get(k)
             for k in cls.__annotations__.keys()
         }
 
         config = {
             **custom_class_properties,
-            "identity": result_data.properties["identity"],
+            "identity": result_data.properties.get("identity"),
             "properties": DirtyDict(properties)
         }
 
@@ -269,20 +441,7 @@ class GraphNode(GraphElement):
         if self.identity:
             return self.identity
 
-        l = self.labels()
-
-        key_builders = [*self.__keys__]
-
-        if not (set(self.__keys__) - {"identity"}) and not self.identity:
-            self.identity = guuid()
-
-        q = "#".join(
-            f"{k}:{'' if v is None else v}"
-            for k, v in self.__dict__.items()
-            if k in key_builders
-        )
-
-        v =  hashlib.sha512(f"{l}#{q}".encode()).hexdigest()
+        v = self.identity_strategy().node_identity(self)
 
         self.identity = v
 
@@ -290,6 +449,8 @@ class GraphNode(GraphElement):
 
 @dataclass
 class GraphEdge(GraphElement):
+    __slots__ = ()
+
     source: GraphNode
     destination: GraphNode
     properties: dict = field(default_factory=dict)
@@ -299,10 +460,7 @@ class GraphEdge(GraphElement):
         if self.identity:
             return self.identity
 
-        l = self.labels()
-        n = f"{self.source.make_identity()}#{self.source.make_identity()}"
-
-        v =  hashlib.sha512(f"{l}#{n}".encode()).hexdigest()
+        v = self.identity_strategy().edge_identity(self)
 
         self.identity = v
 
@@ -1,4 +1,4 @@
-from typing import Dict, Type
+from typing import Dict, Type, List, Iterable, AsyncIterable
 
 from ..exceptions import SQErzoException
 
@@ -13,31 +13,110 @@ class Query:
 
         return self
 
-    def execute(self, map_to: Dict[str, Type] = None):
+    def map_row(self, row: list, map_to: Dict[str, Type] = None) -> list:
+        if not map_to:
+            return row
+
+        tmp = []
+
+        for column in row:
+
+            try:
+                tmp.append(
+                    map_to[column.alias].from_query_results(column)
+                )
+            except KeyError:
+                raise SQErzoException(
+                    f"Can't find class for mapping alias '{column.alias}'"
+                )
+
+        return tmp
+
+    def response(self,
+                 map_to: Dict[str, Type] = None,
+                 projection: str = None,
+                 fetch_size: int = None):
+        """
+        Query response of the DB engine. With 'projection', 'tuple' or
+        'dict', rows are tuples or dicts of column values instead of lists.
+
+        'fetch_size' is the number of rows requested to the DB engine at a
+        time. Only Neo4j supports it: RedisGraph returns all rows at once.
+        """
+        if not projection:
+            response = self.graph.db_engine.query_response(self.query)
+
+        elif map_to:
+            raise SQErzoException("'map_to' can't be used with 'projection'")
+
+        else:
+            response = self.graph.db_engine.query_projection(
+                self.query, projection
+            )
+
+        if fetch_size is not None:
+            if fetch_size <= 0:
+                raise ValueError(f"Invalid fetch size: {fetch_size}")
+
+            response.fetch_size = fetch_size
+
+        return response
+
+    def iter(self,
+             map_to: Dict[str, Type] = None,
+             projection: str = None,
+             fetch_size: int = None) -> Iterable:
+        """Yields rows as the DB engine driver receives them, mapped with
+        'map_to'. See response() for other parameters"""
+        if not self.query:
+            return
+
+        with self.response(map_to, projection, fetch_size) as responses:
+            for row in responses:
+                yield self.map_row(row, map_to)
+
+    def execute(self,
+                map_to: Dict[str, Type] = None,
+                projection: str = None,
+                stream: bool = False,
+                fetch_size: int = None) -> List or Iterable:
+        """List of result rows. With 'stream', rows are returned by a
+        generator instead, as iter() does"""
         if self.query:
-            with self.graph.db_engine.query_response(self.query) as responses:
-                results = []
+            rows = self.iter(map_to, projection, fetch_size)
 
-                for row in responses:
-                    tmp = []
+            if stream:
+                return rows
 
-                    if map_to:
-                        for column in row:
+            return list(rows)
 
-                            try:
-                                tmp.append(
-                                    map_to[column.alias].from_query_results(column)
-                                )
-                            except KeyError:
-                                raise SQErzoException(
-                                    f"Can't find class for mapping alias '{row.alias}'"
-                                )
 
-                        results.append(tmp)
+class AsyncQuery(Query):
+    """asyncio version of Query"""
+
+    async def iter(self,
+                   map_to: Dict[str, Type] = None,
+                   projection: str = None,
+                   fetch_size: int = None) -> AsyncIterable:
+        if not self.query:
+            return
+
+        async with self.response(map_to, projection, fetch_size) \
+                as responses:
+            async for row in responses:
+                yield self.map_row(row, map_to)
+
+    async def execute(self,
+                      map_to: Dict[str, Type] = None,
+                      projection: str = None,
+                      stream: bool = False,
+                      fetch_size: int = None) -> List or AsyncIterable:
+        """See Query.execute. With 'stream', an async generator is
+        returned"""
+        if self.query:
+            rows = self.iter(map_to, projection, fetch_size)
 
-                    else:
-                        results.append(
-                            row
-                        )
+            if stream:
+                return rows
 
-                return results
+            return [row async for row in rows]
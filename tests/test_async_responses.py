@@ -0,0 +1,84 @@
+import asyncio
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from sqerzo import AsyncSQErzoGraph
+from sqerzo.graph.cypher.neo4j import AsyncNeo4jSQErzoQueryResponse
+
+
+class FakeResult:
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.consumed = False
+
+    async def keys(self):
+        return ["n"]
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield (row,)
+
+    async def consume(self):
+        self.consumed = True
+
+
+class FakePool:
+    """Session pool that counts the sessions in use"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.in_use = 0
+
+    @asynccontextmanager
+    async def session(self):
+        self.in_use += 1
+
+        try:
+            yield self
+        finally:
+            self.in_use -= 1
+
+    async def run(self, query, **kwargs):
+        return FakeResult(self.rows)
+
+
+def test_response_releases_session_on_early_return():
+    pool = FakePool([1, 2, 3])
+    graph = SimpleNamespace(pool=pool)
+
+    async def first():
+        async with AsyncNeo4jSQErzoQueryResponse(graph, "q") as responses:
+            async for res in responses:
+                return res[0]
+
+    async def main():
+        assert await first() == 1
+
+        # Released on exit, not by the event loop async generators hook
+        assert pool.in_use == 0
+
+    asyncio.run(main())
+
+
+def test_fetch_one_closes_fetched_nodes():
+    state = {"open": False}
+
+    async def fetch_nodes(node_type, filters, **kwargs):
+        state["open"] = True
+
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            state["open"] = False
+
+    gh = AsyncSQErzoGraph.__new__(AsyncSQErzoGraph)
+    gh.db_engine = SimpleNamespace(fetch_nodes=fetch_nodes, batch_size=10)
+
+    async def main():
+        assert await gh.fetch_one(object) == 0
+        assert state["open"] is False
+
+    asyncio.run(main())
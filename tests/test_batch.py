@@ -0,0 +1,86 @@
+import pytest
+
+from sqerzo.graph.batch import AdaptiveBatchSize, payload_size
+
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveBatchSize(min_size=10, max_size=5)
+
+    with pytest.raises(ValueError):
+        AdaptiveBatchSize(target_latency=0)
+
+
+def test_initial_size_is_bounded():
+    assert AdaptiveBatchSize(size=50, min_size=100).size == 100
+    assert AdaptiveBatchSize(size=50000, max_size=10000).size == 10000
+
+
+def test_is_full_by_elements_or_bytes():
+    sizer = AdaptiveBatchSize(size=100, max_bytes=1000)
+
+    assert not sizer.is_full(99, 999)
+    assert sizer.is_full(100, 0)
+    assert sizer.is_full(1, 1000)
+
+
+def test_fast_full_chunks_grow_size():
+    sizer = AdaptiveBatchSize(size=1000, target_latency=1.0)
+
+    sizer.record(1000, 0, 0.1)
+    assert sizer.size == 1500
+
+    # Chunks that aren't full don't prove bigger ones are fast enough
+    sizer.record(10, 0, 0.1)
+    assert sizer.size == 1500
+
+
+def test_slow_chunks_shrink_size_proportionally():
+    sizer = AdaptiveBatchSize(size=1000, target_latency=1.0)
+
+    sizer.record(1000, 0, 4.0)
+
+    assert sizer.size == 250
+    assert sizer.stats()["shrinks"] == 1
+
+
+def test_wide_elements_shrink_size_to_elements_that_fit():
+    sizer = AdaptiveBatchSize(size=1000, min_size=10, max_bytes=1000)
+
+    sizer.record(40, 1000, 0.1)
+
+    assert sizer.size == 40
+
+
+def test_failures_halve_size_until_min_size():
+    sizer = AdaptiveBatchSize(size=1000, min_size=300)
+
+    sizer.failed()
+    assert sizer.size == 500
+
+    sizer.failed()
+    assert sizer.size == 300
+
+    stats = sizer.stats()
+    assert stats["errors"] == 2
+    assert stats["history"] == [1000, 500, 300]
+
+
+def test_stats():
+    sizer = AdaptiveBatchSize(size=1000, target_latency=1.0)
+
+    assert sizer.stats()["avg_latency"] is None
+
+    sizer.record(1000, 0, 0.5)
+    sizer.record(100, 0, 1.5)
+
+    stats = sizer.stats()
+
+    assert stats["chunks"] == 2
+    assert stats["elements"] == 1100
+    assert stats["last_latency"] == 1.5
+    assert stats["avg_latency"] == 1.0
+
+
+def test_payload_size():
+    assert payload_size(["abc", 1, 2.0, None]) == 3 + 8 * 3
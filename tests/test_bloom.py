@@ -0,0 +1,83 @@
+import pytest
+
+from sqerzo.cache import IdentityBloomFilter
+
+
+def test_added_identities_are_known():
+    bloom = IdentityBloomFilter(capacity=1000)
+
+    bloom.add("a")
+    bloom.update(["b", "c"])
+
+    assert "a" in bloom
+    assert "b" in bloom
+    assert "c" in bloom
+    assert "d" not in bloom
+    assert bloom.stats()["entries"] == 3
+
+
+def test_false_positive_rate():
+    bloom = IdentityBloomFilter(capacity=10000, error_rate=0.01)
+    bloom.update(f"known-{i}" for i in range(10000))
+
+    false_positives = sum(f"new-{i}" in bloom for i in range(10000))
+
+    assert false_positives < 10000 * 0.01 * 2
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        IdentityBloomFilter(capacity=0)
+
+    with pytest.raises(ValueError):
+        IdentityBloomFilter(error_rate=1)
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "identities.bloom")
+
+    bloom = IdentityBloomFilter(capacity=1000, error_rate=0.01, path=path)
+    bloom.update(["a", "b"])
+    bloom.save()
+
+    # Loaded when it's created, with the saved parameters
+    loaded = IdentityBloomFilter(path=path)
+
+    assert "a" in loaded
+    assert "b" in loaded
+    assert "c" not in loaded
+    assert loaded.stats() == bloom.stats()
+
+
+def test_save_without_path():
+    with pytest.raises(ValueError):
+        IdentityBloomFilter().save()
+
+
+def test_load_invalid_file(tmp_path):
+    path = tmp_path / "invalid.bloom"
+    path.write_bytes(b"not a bloom filter")
+
+    with pytest.raises(ValueError):
+        IdentityBloomFilter(path=str(path))
+
+
+def test_from_url(tmp_path):
+    bloom = IdentityBloomFilter.from_url(
+        f"bloom://{tmp_path}/ids.bloom?capacity=500&error_rate=0.05"
+    )
+
+    assert bloom.capacity == 500
+    assert bloom.error_rate == 0.05
+    assert bloom.path == f"{tmp_path}/ids.bloom"
+
+    assert IdentityBloomFilter.from_url("bloom://").path is None
+
+
+def test_clear():
+    bloom = IdentityBloomFilter(capacity=1000)
+    bloom.add("a")
+    bloom.clear()
+
+    assert "a" not in bloom
+    assert bloom.stats()["entries"] == 0
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from sqerzo import GraphNode, GraphEdge, SQErzoGraph
+from sqerzo.cache import MemoryGraphNodeCache, IdentityBloomFilter
+from sqerzo.graph.batch import AdaptiveBatchSize
+from sqerzo.graph.cypher.redisgraph import RedisSQErzoGraphConnection
+
+
+@dataclass
+class DeletedUserNode(GraphNode):
+    __keys__ = ["name"]
+
+    name: str = None
+
+
+@dataclass
+class DeletedKnowsEdge(GraphEdge):
+    pass
+
+
+class DeleteRecorder(RedisSQErzoGraphConnection):
+    """Connection that deletes up to $chunk_size of 'stored' elements in
+    each query"""
+
+    def __init__(self, stored: int, batch_size: int = 10):
+        self.batch_sizer = AdaptiveBatchSize(size=batch_size, min_size=1)
+        self.stored = stored
+        self.queries = []
+
+    def query(self, query, **params):
+        self.queries.append((query, params))
+
+        deleted = min(self.stored, params.get("chunk_size", 1))
+        self.stored -= deleted
+
+        return SimpleNamespace(
+            nodes_deleted=0 if "]->" in query else deleted,
+            relationships_deleted=deleted if "]->" in query else 0
+        )
+
+
+def test_elements_are_deleted_in_chunks():
+    engine = DeleteRecorder(stored=25)
+    progress = []
+
+    assert engine.delete_elements(
+        DeletedUserNode, {"name": "john"}, progress=progress.append
+    ) == 25
+
+    assert progress == [10, 20, 25]
+
+    # A partial chunk is the last one
+    assert len(engine.queries) == 3
+
+    q, params = engine.queries[0]
+    assert "WITH n LIMIT $chunk_size" in q
+    assert "DETACH DELETE n" in q
+    assert params["chunk_size"] == 10
+    assert "john" in params.values()
+
+
+def test_deletes_of_full_chunks_end_with_an_empty_one():
+    engine = DeleteRecorder(stored=20)
+    progress = []
+
+    assert engine.delete_elements(
+        DeletedUserNode, batch_size=5, progress=progress.append
+    ) == 20
+
+    assert progress == [5, 10, 15, 20]
+    assert len(engine.queries) == 5
+
+
+def test_edges_are_counted_by_their_relationships():
+    engine = DeleteRecorder(stored=3)
+
+    assert engine.delete_elements(DeletedKnowsEdge) == 3
+
+    q, params = engine.queries[0]
+    assert "]->()" in q
+    assert "DETACH" not in q
+
+
+def test_nothing_to_delete():
+    engine = DeleteRecorder(stored=0)
+    progress = []
+
+    assert engine.delete_elements(progress=progress.append) == 0
+    assert progress == []
+    assert len(engine.queries) == 1
+
+
+def make_graph(engine: DeleteRecorder) -> SQErzoGraph:
+    gh = SQErzoGraph.__new__(SQErzoGraph)
+    gh.db_engine = engine
+    gh.cache = MemoryGraphNodeCache()
+    gh.known_identities = IdentityBloomFilter(capacity=1000)
+
+    return gh
+
+
+def test_deleted_nodes_are_not_known():
+    user = DeletedUserNode(name="john")
+
+    gh = make_graph(DeleteRecorder(stored=1))
+    gh.known_identities.add(user.make_identity())
+
+    assert gh.delete_many(DeletedUserNode, name="john") == 1
+    assert user.identity not in gh.known_identities
+
+    gh = make_graph(DeleteRecorder(stored=1))
+    gh.known_identities.add(user.identity)
+
+    assert gh.delete(user)
+    assert user.identity not in gh.known_identities
+
+
+def test_deleted_edges_keep_known_nodes():
+    user = DeletedUserNode(name="john")
+
+    gh = make_graph(DeleteRecorder(stored=1))
+    gh.known_identities.add(user.make_identity())
+
+    assert gh.delete_many(DeletedKnowsEdge) == 1
+    assert user.identity in gh.known_identities
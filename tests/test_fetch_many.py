@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import pytest
+
+from sqerzo import GraphNode, SQErzoGraph
+
+
+@dataclass
+class LogLineNode(GraphNode):
+    text: str = None
+    limit: int = None
+
+
+class FetchRecorder:
+    """DB engine stub that records fetch_nodes() calls"""
+
+    batch_size = 100
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch_nodes(self, node_type, filters, **paging):
+        self.calls.append((filters, paging))
+        yield from ("node-1", "node-2")
+
+
+def make_graph() -> SQErzoGraph:
+    gh = SQErzoGraph.__new__(SQErzoGraph)
+    gh.db_engine = FetchRecorder()
+
+    return gh
+
+
+def test_kwargs_are_property_filters():
+    gh = make_graph()
+
+    assert list(gh.fetch_many(LogLineNode, text="error")) == \
+           ["node-1", "node-2"]
+
+    filters, paging = gh.db_engine.calls[0]
+    assert filters == {"text": "error"}
+    assert paging == {
+        "page_size": 100, "skip": None, "limit": None, "order_by": None
+    }
+
+
+def test_properties_named_as_pagination_parameters_use_filters():
+    gh = make_graph()
+
+    list(gh.fetch_many(LogLineNode, {"limit": 10}, limit=5, text="error"))
+
+    filters, paging = gh.db_engine.calls[0]
+    assert filters == {"limit": 10, "text": "error"}
+    assert paging["limit"] == 5
+
+
+def test_pagination_parameters_named_as_properties_are_deprecated():
+    gh = make_graph()
+
+    # Filters the property, as previous versions did
+    with pytest.warns(DeprecationWarning, match="limit"):
+        list(gh.fetch_many(LogLineNode, limit=5))
+
+    assert gh.db_engine.calls[-1] == ({"limit": 5}, {
+        "page_size": 100, "skip": None, "limit": None, "order_by": None
+    })
+
+    # 'skip' isn't a LogLineNode property
+    list(gh.fetch_many(LogLineNode, skip=5))
+    assert gh.db_engine.calls[-1][1]["skip"] == 5
+
+    # With 'filters', pagination parameters are always pagination
+    list(gh.fetch_many(LogLineNode, {}, limit=5))
+
+    assert gh.db_engine.calls[-1] == ({}, {
+        "page_size": 100, "skip": None, "limit": 5, "order_by": None
+    })
+
+
+def test_pagination_parameters_are_keyword_only():
+    gh = make_graph()
+
+    with pytest.raises(TypeError):
+        list(gh.fetch_many(LogLineNode, {}, 10))
+
+
+def test_fetch_one_reads_parameters_as_fetch_many():
+    gh = make_graph()
+
+    assert gh.fetch_one(LogLineNode, text="error", order_by="-text") == \
+           "node-1"
+
+    filters, paging = gh.db_engine.calls[-1]
+    assert filters == {"text": "error"}
+    assert paging["order_by"] == "-text"
+    assert paging["limit"] == 1
+
+    assert gh.fetch_one(LogLineNode, {"limit": 10}) == "node-1"
+    assert gh.db_engine.calls[-1][0] == {"limit": 10}
+
+    with pytest.warns(DeprecationWarning):
+        gh.fetch_one(LogLineNode, limit=10)
+
+    assert gh.db_engine.calls[-1][0] == {"limit": 10}
+
+    # It fetches one node
+    with pytest.raises(ValueError, match="limit"):
+        gh.fetch_one(LogLineNode, {}, limit=10)
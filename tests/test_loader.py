@@ -0,0 +1,115 @@
+import re
+import queue
+import threading
+
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import sqerzo.__sqerzo__
+
+from sqerzo import GraphNode, GraphEdge
+from sqerzo.loader import _load_worker
+from sqerzo.cache import MemoryGraphNodeCache
+from sqerzo.graph.batch import AdaptiveBatchSize
+from sqerzo.graph.cypher.transaction import CypherSQErzoTransaction
+
+
+@dataclass
+class LoaderUserNode(GraphNode):
+    __keys__ = ["name"]
+
+    name: str = None
+
+
+@dataclass
+class LoaderKnowsEdge(GraphEdge):
+    pass
+
+
+class GraphDB:
+    """Committed node identities and edges. Edges are only written when
+    their nodes exist, like MATCH ... MATCH ... CREATE"""
+
+    def __init__(self):
+        self.nodes = set()
+        self.edges = 0
+        self.lock = threading.Lock()
+
+    def write(self, query: str, batch: list):
+        with self.lock:
+            if "(:" in query:
+                identity = int(re.search(r"identity: row\[(\d+)]", query)[1])
+                self.nodes.update(row[identity] for row in batch)
+
+            else:
+                self.edges += sum(
+                    row["identity_from"] in self.nodes
+                    and row["identity_to"] in self.nodes
+                    for row in batch
+                )
+
+
+class StubServerTransaction:
+
+    def __init__(self, db):
+        self.db = db
+        self.queries = []
+
+    def query(self, query, **params):
+        self.queries.append((query, params["batch"]))
+
+    def commit(self):
+        for query, batch in self.queries:
+            self.db.write(query, batch)
+
+    def rollback(self):
+        pass
+
+
+class StubGraph:
+
+    db = None
+
+    def __init__(self, connection_string):
+        self.db_engine = SimpleNamespace(
+            batch_sizer=AdaptiveBatchSize(size=2, min_size=2, max_size=2),
+            begin_transaction=lambda: StubServerTransaction(self.db),
+            is_batch_size_error=lambda e: False,
+            is_retryable_error=lambda e: False
+        )
+        self.cache = MemoryGraphNodeCache()
+        self.known_identities = None
+
+    def transaction(self, **kwargs):
+        return CypherSQErzoTransaction(self, **kwargs)
+
+
+def test_worker_writes_edges_after_their_nodes(monkeypatch):
+    db = GraphDB()
+    monkeypatch.setattr(StubGraph, "db", db)
+    monkeypatch.setattr(sqerzo.__sqerzo__, "SQErzoGraph", StubGraph)
+
+    users = [LoaderUserNode(name=f"user-{i}") for i in range(10)]
+    edges = [
+        LoaderKnowsEdge(source=source, destination=destination)
+        for source, destination in zip(users, users[1:])
+    ]
+
+    # Edges are received before their nodes
+    elements = queue.Queue()
+    elements.put(edges)
+    elements.put(users)
+    elements.put(None)
+
+    results = queue.Queue()
+
+    _load_worker(
+        "stub://", "create", 0, elements, threading.Barrier(1), results
+    )
+
+    report = results.get_nowait()
+
+    assert report["error"] is None
+    assert (report["nodes"], report["edges"]) == (10, 9)
+    assert len(db.nodes) == 10
+    assert db.edges == 9
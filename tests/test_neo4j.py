@@ -0,0 +1,44 @@
+import pytest
+
+from neo4j.exceptions import Neo4jError, ServiceUnavailable, SessionExpired
+
+from sqerzo.graph.cypher.neo4j import Neo4JSQErzoGraphConnection
+
+
+def server_error(code: str) -> Neo4jError:
+    return Neo4jError._hydrate_neo4j(code=code, message="error")
+
+
+@pytest.fixture
+def connection() -> Neo4JSQErzoGraphConnection:
+    return Neo4JSQErzoGraphConnection.__new__(Neo4JSQErzoGraphConnection)
+
+
+@pytest.mark.parametrize("error", [
+    ServiceUnavailable("leader switch"),
+    SessionExpired("leader switch"),
+    server_error("Neo.TransientError.Transaction.DeadlockDetected"),
+    server_error("Neo.ClientError.Cluster.NotALeader"),
+])
+def test_retryable_errors(connection, error):
+    assert connection.is_retryable_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    server_error("Neo.TransientError.General.OutOfMemoryError"),
+    server_error("Neo.ClientError.Transaction.TransactionTimedOut"),
+    server_error("Neo.ClientError.Statement.SyntaxError"),
+    ValueError("not a Neo4j error"),
+])
+def test_not_retryable_errors(connection, error):
+    assert not connection.is_retryable_error(error)
+
+
+def test_batch_size_errors(connection):
+    assert connection.is_batch_size_error(
+        server_error("Neo.TransientError.General.OutOfMemoryError")
+    )
+    assert connection.is_batch_size_error(TimeoutError())
+    assert not connection.is_batch_size_error(
+        server_error("Neo.TransientError.Transaction.DeadlockDetected")
+    )
@@ -0,0 +1,231 @@
+import types
+import asyncio
+
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from redisgraph import Node, Edge
+
+import pytest
+
+from sqerzo import GraphNode
+from sqerzo.exceptions import SQErzoException
+from sqerzo.graph.query import Query, AsyncQuery
+from sqerzo.graph.interfaces import SQErzoQueryResponse, ResultElement, \
+    check_projection
+from sqerzo.graph.cypher.redisgraph import RedisGraphSQErzoQueryResponse, \
+    RedisResultElement
+
+
+class ListResponse(SQErzoQueryResponse):
+    """Query response with rows of column values"""
+
+    def __init__(self, graph, query, aliases=(), rows=(), **kwargs):
+        self.aliases = aliases
+        self.rows = rows
+
+    def __iter__(self):
+        row = self.row_mapper(self.aliases)
+
+        for values in self.rows:
+            yield row(values)
+
+
+def test_rows_are_lists_by_default():
+    response = ListResponse(None, "q", ("name", "age"), [("john", 30)])
+
+    assert list(response) == [["john", 30]]
+
+
+def test_tuple_and_dict_projections():
+    response = ListResponse(None, "q", ("name", "age"), [("john", 30)])
+
+    response.projection = "tuple"
+    assert list(response) == [("john", 30)]
+
+    response.projection = "dict"
+    assert list(response) == [{"name": "john", "age": 30}]
+
+
+def test_invalid_projection():
+    assert check_projection("dict") == "dict"
+
+    with pytest.raises(ValueError):
+        check_projection("list")
+
+
+def test_redisgraph_nodes_and_edges_are_wrapped():
+    response = RedisGraphSQErzoQueryResponse(None, "q")
+    row = response.row_mapper(["u", "e", "name"])
+
+    user = Node(node_id=1, label="User", properties={"name": "john"})
+    edge = Edge(user, "Meet", user, edge_id=2)
+
+    u, e, name = row([user, edge, "john"])
+
+    assert isinstance(u, ResultElement)
+    assert isinstance(u, RedisResultElement)
+    assert (u.id, u.alias, u.labels, u.properties) == \
+           (1, "u", ["User"], {"name": "john"})
+    assert (e.id, e.alias, e.labels) == (2, "e", ["Meet"])
+
+    # Scalars are returned as they are
+    assert name == "john"
+
+
+def test_result_elements_are_decoded_lazily():
+    class CountingNode:
+        reads = 0
+
+        @property
+        def properties(self):
+            CountingNode.reads += 1
+            return {"name": "john"}
+
+    element = RedisResultElement(CountingNode(), "u")
+
+    assert CountingNode.reads == 0
+    assert element.properties == {"name": "john"}
+    assert CountingNode.reads == 1
+
+
+class StreamResponse(ListResponse):
+    """Response that counts the rows read from the 'driver'"""
+
+    read = 0
+
+    def __iter__(self):
+        row = self.row_mapper(self.aliases)
+
+        for values in self.rows:
+            self.read += 1
+            yield row(values)
+
+
+class StubQueryEngine:
+
+    def __init__(self, rows, aliases=("u",), response_class=StreamResponse):
+        self.rows = rows
+        self.aliases = aliases
+        self.response_class = response_class
+        self.responses = []
+
+    def query_response(self, query, **kwargs):
+        response = self.response_class(None, query, self.aliases, self.rows)
+        self.responses.append(response)
+
+        return response
+
+    def query_projection(self, query, projection="tuple", **kwargs):
+        response = self.query_response(query, **kwargs)
+        response.projection = check_projection(projection)
+
+        return response
+
+
+@dataclass
+class QueryUserNode(GraphNode):
+    name: str = None
+
+
+def user_element(name: str) -> Node:
+    return Node(node_id=1, label="QueryUser", properties={
+        "name": name, "identity": name
+    })
+
+
+class RedisStreamResponse(StreamResponse, RedisGraphSQErzoQueryResponse):
+    pass
+
+
+def make_query(engine: StubQueryEngine) -> Query:
+    return Query(SimpleNamespace(db_engine=engine)).raw("match (u) return u")
+
+
+def test_iter_yields_rows_while_they_are_read():
+    engine = StubQueryEngine([["a"], ["b"], ["c"]])
+    rows = make_query(engine).iter()
+
+    assert next(rows) == ["a"]
+    assert engine.responses[0].read == 1
+
+    assert list(rows) == [["b"], ["c"]]
+
+
+def test_execute_stream_returns_a_generator():
+    engine = StubQueryEngine([["a"], ["b"]])
+    query = make_query(engine)
+
+    rows = query.execute(stream=True)
+
+    assert isinstance(rows, types.GeneratorType)
+    assert engine.responses == []
+    assert list(rows) == [["a"], ["b"]]
+
+    assert query.execute() == [["a"], ["b"]]
+
+
+def test_iter_maps_rows_and_projections():
+    engine = StubQueryEngine(
+        [[user_element("john")]], response_class=RedisStreamResponse
+    )
+
+    [[user]] = list(make_query(engine).iter(map_to={"u": QueryUserNode}))
+
+    assert isinstance(user, QueryUserNode)
+    assert user.name == "john"
+
+    engine = StubQueryEngine([["john", 30]], aliases=("name", "age"))
+
+    assert list(make_query(engine).iter(projection="dict")) == \
+           [{"name": "john", "age": 30}]
+
+    with pytest.raises(SQErzoException):
+        list(make_query(engine).iter(
+            map_to={"u": QueryUserNode}, projection="dict"
+        ))
+
+
+def test_fetch_size():
+    engine = StubQueryEngine([["a"]])
+
+    list(make_query(engine).iter(fetch_size=500))
+    assert engine.responses[0].fetch_size == 500
+
+    with pytest.raises(ValueError):
+        list(make_query(engine).iter(fetch_size=0))
+
+
+def test_queries_without_text():
+    query = Query(SimpleNamespace(db_engine=StubQueryEngine([])))
+
+    assert query.execute() is None
+    assert list(query.iter()) == []
+
+
+class AsyncStreamResponse(StreamResponse):
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def __aiter__(self):
+        for row in self:
+            yield row
+
+
+def test_async_iter_and_stream():
+    engine = StubQueryEngine(
+        [["a"], ["b"]], response_class=AsyncStreamResponse
+    )
+    query = AsyncQuery(SimpleNamespace(db_engine=engine)).raw("q")
+
+    async def main():
+        rows = await query.execute(stream=True)
+
+        assert [row async for row in rows] == [["a"], ["b"]]
+        assert await query.execute() == [["a"], ["b"]]
+
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+import pickle
+import asyncio
+import threading
+
+from datetime import datetime
+from dataclasses import dataclass
+
+from sqerzo import GraphNode
+from sqerzo.cache import RedisGraphNodeCache, MemoryGraphNodeCache
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    def execute(self):
+        self.redis.calls.append(("pipeline", len(self.commands)))
+
+        for key, value, ex in self.commands:
+            self.redis.data[key] = value
+            self.redis.ttls[key] = ex
+
+
+class FakeRedis:
+    """Commands used by the cache, recorded in 'calls'"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.calls = []
+
+    def mget(self, keys):
+        self.calls.append(("mget", len(keys)))
+        return [self.data.get(k) for k in keys]
+
+    def mset(self, values):
+        self.calls.append(("mset", len(values)))
+        self.data.update(values)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        self.calls.append(("delete", len(keys)))
+
+        for k in keys:
+            self.data.pop(k, None)
+
+
+@dataclass
+class CachedUserNode(GraphNode):
+    name: str = None
+    age: int = None
+    created: datetime = None
+
+
+def make_user(name: str) -> CachedUserNode:
+    user = CachedUserNode(
+        name=name, age=30, created=datetime(2020, 1, 2, 3, 4, 5)
+    )
+    user.make_identity()
+
+    return user
+
+
+def test_save_and_get_ids_are_batched():
+    redis = FakeRedis()
+    cache = RedisGraphNodeCache(redis)
+
+    users = [make_user(f"user-{i}") for i in range(10)]
+    cache.save_ids({u.identity: u for u in users})
+
+    assert redis.calls == [("mset", 10)]
+
+    found = cache.get_ids([u.identity for u in users])
+
+    assert redis.calls[-1] == ("mget", 10)
+    assert [u.name for u in found] == [u.name for u in users]
+
+
+def test_ttl_uses_one_pipeline():
+    redis = FakeRedis()
+    cache = RedisGraphNodeCache(redis, ttl=300)
+
+    users = [make_user(f"user-{i}") for i in range(5)]
+    cache.save_ids({u.identity: u for u in users})
+
+    assert redis.calls == [("pipeline", 5)]
+    assert set(redis.ttls.values()) == {300}
+
+
+def test_hit_and_miss_counters():
+    cache = RedisGraphNodeCache(FakeRedis())
+
+    user = make_user("john")
+    cache.save(user)
+
+    assert cache.get_ids([user.identity, "missing", "other"])[1:] \
+           == [None, None]
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_nodes_are_rebuilt_from_json():
+    redis = FakeRedis()
+    cache = RedisGraphNodeCache(redis)
+
+    user = make_user("john")
+    user.properties["email"] = "john@example.com"
+    user.add_label("Admin")
+    cache.save(user)
+
+    raw = redis.data[f"sqerzo:node:{user.identity}"]
+    assert raw.startswith(b"{")
+
+    found = cache.get_id(user.identity)
+
+    assert type(found) is CachedUserNode
+    assert found.identity == user.identity
+    assert found.name == "john"
+    assert found.age == 30
+    assert found.created == datetime(2020, 1, 2, 3, 4, 5)
+    assert found.properties["email"] == "john@example.com"
+    assert found.labels().split(":") == ["CachedUser", "Admin"]
+    assert found.dirty_properties() == []
+    assert found.dirty_labels() == []
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (exec, ("raise RuntimeError('unpickled')",))
+
+
+def test_pickled_and_unknown_entries_are_misses():
+    redis = FakeRedis()
+    cache = RedisGraphNodeCache(redis)
+
+    redis.data["sqerzo:node:pickled"] = pickle.dumps(_Exploit())
+    redis.data["sqerzo:node:unknown"] = \
+        b'{"class":"os.system","labels":[],"properties":{}}'
+
+    assert cache.get_ids(["pickled", "unknown"]) == [None, None]
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_async_calls_run_in_a_thread_pool():
+    redis = FakeRedis()
+    threads = []
+
+    def mget(keys):
+        threads.append(threading.current_thread())
+        return [None for _ in keys]
+
+    redis.mget = mget
+
+    cache = RedisGraphNodeCache(redis)
+    memory = MemoryGraphNodeCache()
+
+    async def main():
+        assert await cache.run_async(cache.get_id, "john") is None
+        assert await memory.run_async(memory.get_id, "john") is None
+
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+
+    assert threads and threads[0] is not loop_thread
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from sqerzo.graph.cypher.redisgraph import RedisServerTransaction, \
+    params_header
+
+
+class FakePipeline:
+
+    def __init__(self):
+        self.commands = []
+
+    def execute_command(self, *args):
+        self.commands.append(args)
+
+
+def test_params_header():
+    assert params_header({
+        "batch": [["a\"b", 1, None, 2.5]], "map": {"k": "v"}
+    }) == 'CYPHER batch=[["a\\"b",1,null,2.5]] map={k:"v"} '
+
+
+def test_transaction_queries_send_their_params():
+    pipeline = FakePipeline()
+    graph = SimpleNamespace(
+        name="email",
+        redis_con=SimpleNamespace(pipeline=lambda transaction: pipeline)
+    )
+
+    tx = RedisServerTransaction(graph)
+    tx.query("MATCH (n) RETURN n")
+    tx.query("CREATE (:User { name: $name })", name="john")
+
+    assert pipeline.commands == [
+        ("GRAPH.QUERY", "email", "MATCH (n) RETURN n", "--compact"),
+        ("GRAPH.QUERY", "email",
+         'CYPHER name="john" CREATE (:User { name: $name })', "--compact"),
+    ]
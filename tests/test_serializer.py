@@ -0,0 +1,164 @@
+from datetime import datetime, timezone, timedelta
+from dataclasses import dataclass
+
+import pytest
+
+from sqerzo import GraphNode
+from sqerzo.config import SQErzoConfig
+from sqerzo.graph.cypher.lang import node_row, node_properties, \
+    encode_value, encode_datetime, get_serializer
+
+
+@dataclass
+class SerializedUserNode(GraphNode):
+    __keys__ = ["name"]
+
+    name: str = None
+    age: int = None
+    created: datetime = None
+
+
+class SlottedSerializedUserNode(GraphNode):
+    __slotted__ = True
+    __keys__ = ["name"]
+
+    name: str = None
+    age: int = None
+    created: datetime = None
+
+
+CREATED = datetime(2020, 1, 2, 3, 4, 5)
+
+
+@pytest.fixture(params=[
+    ("str", "int", "float", "bool"),
+    ("str", "int", "float", "bool", "datetime")
+], ids=["redisgraph", "neo4j"])
+def supported_types(request, monkeypatch):
+    monkeypatch.setitem(SQErzoConfig, "SUPPORTED_TYPES", request.param)
+
+    return request.param
+
+
+def expected_row(node) -> dict:
+    return {k: encode_value(v) for k, v in node_properties(node).items()}
+
+
+def compiled_values(node) -> list or None:
+    return get_serializer(node.__class__).values(node)
+
+
+@pytest.mark.parametrize("cls", [
+    SerializedUserNode, SlottedSerializedUserNode
+])
+def test_compiled_rows_match_node_properties(supported_types, cls):
+    nodes = [
+        cls(name="john", age=30, created=CREATED),
+        cls(name="john", age=None, created=None),
+        cls(name="john", age="30", created="2020-01-02")
+    ]
+
+    for node in nodes:
+        assert compiled_values(node) is not None
+
+        keys, values = node_row(node)
+
+        assert dict(zip(keys, values)) == expected_row(node)
+        assert keys[0] == "identity"
+        assert values[0] == node.identity
+
+
+def test_datetimes_are_encoded_by_db_engine_types(supported_types):
+    keys, values = node_row(SerializedUserNode(name="john", created=CREATED))
+    created = dict(zip(keys, values))["created"]
+
+    if "datetime" in supported_types:
+        # Zoned, as previous datetime(...) literals stored them
+        assert created == CREATED.replace(tzinfo=timezone.utc)
+        assert created.tzinfo is timezone.utc
+    else:
+        assert created == str(CREATED)
+
+
+def test_datetimes_keep_previous_representation():
+    madrid = timezone(timedelta(hours=2))
+
+    assert encode_datetime(datetime(2020, 1, 2, 3, 4, 5, 678)) == \
+           datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    encoded = encode_datetime(datetime(2020, 1, 2, 3, 4, 5, tzinfo=madrid))
+
+    assert encoded.utcoffset() == timedelta(hours=2)
+    assert encoded.hour == 3
+
+
+def test_changed_nodes_use_compiled_serializer(supported_types):
+    node = SerializedUserNode(name="john", age=30)
+    node.age = 31
+    node.add_label("Admin")
+
+    assert node.dirty_properties() == ["age"]
+    assert compiled_values(node) is not None
+
+    keys, values = node_row(node)
+    assert dict(zip(keys, values)) == expected_row(node)
+
+
+def test_nodes_with_extra_attributes_fall_back(supported_types):
+    node = SerializedUserNode(name="john", age=30)
+    node.nickname = "johnny"
+
+    assert compiled_values(node) is None
+
+    keys, values = node_row(node)
+    row = dict(zip(keys, values))
+
+    assert row == expected_row(node)
+    assert row["nickname"] == "johnny"
+
+
+def test_nodes_with_missing_fields_fall_back(supported_types):
+    node = SerializedUserNode(name="john", age=30)
+    node.nickname = "johnny"
+    del node.age
+
+    # Same number of attributes, but not the class fields
+    assert compiled_values(node) is None
+
+    keys, values = node_row(node)
+    assert dict(zip(keys, values)) == expected_row(node)
+
+
+@pytest.mark.parametrize("cls", [
+    SerializedUserNode, SlottedSerializedUserNode
+])
+def test_nodes_with_properties_fall_back(supported_types, cls):
+    node = cls(name="john", age=30)
+    node.properties["city"] = "Madrid"
+
+    assert compiled_values(node) is None
+
+    keys, values = node_row(node)
+    row = dict(zip(keys, values))
+
+    assert row == expected_row(node)
+    assert row["city"] == "Madrid"
+
+
+def test_slotted_nodes_have_no_extra_attributes():
+    node = SlottedSerializedUserNode(name="john")
+
+    with pytest.raises(AttributeError):
+        node.nickname = "johnny"
+
+
+def test_serializers_are_compiled_by_supported_types(monkeypatch):
+    node = SerializedUserNode(name="john", age=30)
+
+    monkeypatch.setitem(SQErzoConfig, "SUPPORTED_TYPES", ("str",))
+    only_str = get_serializer(SerializedUserNode)
+    assert only_str.values(node)[2] == "30"
+
+    monkeypatch.setitem(SQErzoConfig, "SUPPORTED_TYPES", ("str", "int"))
+    assert get_serializer(SerializedUserNode) is not only_str
+    assert get_serializer(SerializedUserNode).values(node)[2] == 30
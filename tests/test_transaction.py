@@ -0,0 +1,456 @@
+import asyncio
+
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import pytest
+
+from sqerzo import GraphNode, GraphEdge
+from sqerzo.cache import MemoryGraphNodeCache, IdentityBloomFilter
+from sqerzo.graph.batch import AdaptiveBatchSize
+from sqerzo.graph.cypher.transaction import CypherSQErzoTransaction, \
+    AsyncCypherSQErzoTransaction, TransactionChunk
+
+
+@dataclass
+class TxUserNode(GraphNode):
+    __keys__ = ["name"]
+
+    name: str = None
+
+
+@dataclass
+class TxKnowsEdge(GraphEdge):
+    pass
+
+
+class StubServerTransaction:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries = []
+
+    def query(self, query, **params):
+        if error := self.engine.fail(query, params):
+            raise error
+
+        self.queries.append((query, params))
+
+    def commit(self):
+        self.engine.committed.append(self.queries)
+
+    def rollback(self):
+        self.engine.rolled_back += 1
+
+
+class StubEngine:
+    """DB engine that records the queries of committed transactions.
+    'fail' returns the error raised by a query, if any"""
+
+    def __init__(self, size=10, min_size=2, max_size=10, fail=None):
+        self.batch_sizer = AdaptiveBatchSize(
+            size=size, min_size=min_size, max_size=max_size
+        )
+        self.fail = fail or (lambda query, params: None)
+        self.committed = []
+        self.rolled_back = 0
+        self.sync = self
+
+    transaction_class = CypherSQErzoTransaction
+
+    def begin_transaction(self):
+        return StubServerTransaction(self)
+
+    def is_batch_size_error(self, error):
+        return isinstance(error, TimeoutError)
+
+    def is_retryable_error(self, error):
+        return isinstance(error, ConnectionError)
+
+    def written(self, clause="(:"):
+        """Rows written by committed queries with 'clause'"""
+        return [
+            row
+            for queries in self.committed
+            for query, params in queries
+            if clause in query
+            for row in params["batch"]
+        ]
+
+
+class AsyncStubServerTransaction(StubServerTransaction):
+
+    async def query(self, query, **params):
+        super(AsyncStubServerTransaction, self).query(query, **params)
+
+    async def commit(self):
+        super(AsyncStubServerTransaction, self).commit()
+
+    async def rollback(self):
+        super(AsyncStubServerTransaction, self).rollback()
+
+
+class AsyncStubEngine(StubEngine):
+
+    async def begin_transaction(self):
+        return AsyncStubServerTransaction(self)
+
+
+def make_graph(engine: StubEngine) -> SimpleNamespace:
+    return SimpleNamespace(
+        db_engine=engine,
+        cache=MemoryGraphNodeCache(),
+        known_identities=None
+    )
+
+
+def make_users(count: int):
+    return [TxUserNode(name=f"user-{i}") for i in range(count)]
+
+
+def fail_batches_bigger_than(rows: int):
+    def fail(query, params):
+        if len(params["batch"]) > rows:
+            return TimeoutError("Transaction timed out")
+
+    return fail
+
+
+def test_chunk_split_keeps_nodes_before_edges():
+    tx = CypherSQErzoTransaction(make_graph(StubEngine(size=100)))
+    chunk = TransactionChunk()
+
+    users = make_users(5)
+
+    for user in users:
+        tx.add_to_chunk(chunk, user)
+
+    for source, destination in zip(users, users[1:]):
+        tx.add_to_chunk(
+            chunk, TxKnowsEdge(source=source, destination=destination)
+        )
+
+    chunks = chunk.split(3)
+
+    assert [c.size for c in chunks] == [3, 3, 3]
+    assert [len(c.nodes) for c in chunks] == [3, 2, 0]
+    assert [n.name for c in chunks for n in c.nodes] == \
+           [u.name for u in users]
+    assert sum(c.bytes for c in chunks) == chunk.bytes
+
+
+def test_failed_chunk_is_split_and_written():
+    engine = StubEngine(size=8, fail=fail_batches_bigger_than(3))
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    for user in make_users(8):
+        tx.add(user)
+
+    tx.commit()
+
+    assert len(engine.written()) == 8
+    assert all(len(queries[0][1]["batch"]) <= 3
+               for queries in engine.committed)
+
+    # 8 -> 4 + 4 -> 2 + 2 + 2 + 2
+    stats = engine.batch_sizer.stats()
+    assert stats["errors"] == 3
+    assert stats["history"][:3] == [8, 4, 2]
+
+
+def test_failed_chunk_of_min_size_is_raised():
+    engine = StubEngine(size=8, fail=fail_batches_bigger_than(1))
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with pytest.raises(TimeoutError):
+        for user in make_users(8):
+            tx.add(user)
+
+    assert engine.written() == []
+
+
+def test_failed_chunks_of_atomic_transactions_are_not_split():
+    engine = StubEngine(size=8, fail=fail_batches_bigger_than(3))
+    tx = CypherSQErzoTransaction(make_graph(engine), atomic=True)
+
+    with pytest.raises(TimeoutError):
+        for user in make_users(8):
+            tx.add(user)
+
+
+def test_async_failed_chunk_is_split_and_written():
+    engine = AsyncStubEngine(size=8, fail=fail_batches_bigger_than(3))
+    tx = AsyncCypherSQErzoTransaction(make_graph(engine))
+
+    for user in make_users(8):
+        tx.add(user)
+
+    asyncio.run(tx.commit())
+
+    assert len(engine.written()) == 8
+    assert engine.batch_sizer.stats()["errors"] == 3
+
+
+def test_async_write_writes_full_chunks():
+    engine = AsyncStubEngine(size=5, min_size=5, max_size=5)
+    tx = AsyncCypherSQErzoTransaction(make_graph(engine))
+
+    async def main():
+        for user in make_users(12):
+            await tx.write(user)
+
+        assert len(engine.written()) == 10
+
+        await tx.commit()
+
+    asyncio.run(main())
+
+    assert len(engine.written()) == 12
+    assert [len(queries[0][1]["batch"]) for queries in engine.committed] \
+           == [5, 5, 2]
+
+
+def test_create_transactions_skip_known_nodes():
+    engine = StubEngine()
+    graph = make_graph(engine)
+    graph.known_identities = IdentityBloomFilter(capacity=1000)
+
+    users = make_users(4)
+    graph.known_identities.update(u.make_identity() for u in users[:2])
+
+    with CypherSQErzoTransaction(graph) as tx:
+        for user in users:
+            tx.add(user)
+
+    assert len(engine.written()) == 2
+    assert graph.known_identities.stats()["skipped"] == 2
+    assert all(u.identity in graph.known_identities for u in users)
+
+
+def test_upsert_transactions_write_known_nodes():
+    engine = StubEngine()
+    graph = make_graph(engine)
+    graph.known_identities = IdentityBloomFilter(capacity=1000)
+
+    users = make_users(4)
+    graph.known_identities.update(u.make_identity() for u in users[:2])
+
+    with CypherSQErzoTransaction(graph, mode="upsert") as tx:
+        for user in users:
+            tx.add(user)
+
+    assert len(engine.written("MERGE (n:")) == 4
+    assert graph.known_identities.stats()["skipped"] == 0
+
+
+def test_dedup_memory_is_bounded():
+    engine = StubEngine(size=100, min_size=100, max_size=100)
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    tracked = []
+
+    for user in make_users(5000):
+        tx.add(user)
+        tracked.append(len(tx._chunk.identities) + len(tx._uncommitted))
+
+    written_bytes = tx._written.stats()["bytes"]
+
+    for user in make_users(5000):
+        tx.add(user)
+
+    tx.commit()
+
+    assert len(engine.written()) == 5000
+    assert max(tracked) < 100
+    assert len(tx._chunk.identities) == 0
+    assert tx._written.stats()["bytes"] == written_bytes
+
+
+def test_nodes_of_written_chunks_are_merged():
+    engine = StubEngine(size=10, min_size=10, max_size=10)
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with tx:
+        for i, user in enumerate(make_users(30)):
+            tx.add(user)
+
+            if i % 7 == 0:
+                tx.add(TxUserNode(name="john"))
+
+    created = [row[-1] for row in engine.written("CREATE (:")]
+    merged = {row[-1] for row in engine.written("MERGE (n:")}
+
+    # Created once, in the first chunk, and merged by the next chunks
+    assert len(created) == 31
+    assert created.count("john") == 1
+    assert merged == {"john"}
+
+    merge_query = [
+        query
+        for queries in engine.committed
+        for query, params in queries
+        if "MERGE (n:" in query
+    ][0]
+    assert "ON CREATE SET" in merge_query
+
+
+def test_nodes_added_twice_to_a_chunk_are_written_once():
+    engine = StubEngine(size=10, min_size=10, max_size=10)
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    user = TxUserNode(name="john")
+
+    with tx:
+        tx.add(user)
+        tx.add(TxUserNode(name="john"))
+
+    assert len(engine.written()) == 1
+
+
+def test_known_identities_skip_nodes_of_written_chunks():
+    engine = StubEngine(size=10, min_size=10, max_size=10)
+    graph = make_graph(engine)
+    graph.known_identities = IdentityBloomFilter(capacity=1000)
+
+    with CypherSQErzoTransaction(graph) as tx:
+        for _ in range(3):
+            for user in make_users(10):
+                tx.add(user)
+
+    assert len(engine.written()) == 10
+
+
+def test_atomic_transactions_skip_nodes_of_written_chunks():
+    engine = StubEngine(size=10, min_size=10, max_size=10)
+
+    with CypherSQErzoTransaction(make_graph(engine), atomic=True) as tx:
+        for _ in range(3):
+            for user in make_users(10):
+                tx.add(user)
+
+    assert len(engine.written()) == 10
+
+
+@pytest.fixture
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(CypherSQErzoTransaction, "RETRY_WAIT", 0)
+    monkeypatch.setattr(AsyncCypherSQErzoTransaction, "RETRY_WAIT", 0)
+
+
+def fail_times(times: int, error: Exception):
+    failures = {"left": times}
+
+    def fail(query, params):
+        if failures["left"]:
+            failures["left"] -= 1
+            return error
+
+    return fail
+
+
+def test_transient_errors_are_retried(no_retry_wait):
+    engine = StubEngine(fail=fail_times(2, ConnectionError("deadlock")))
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with tx:
+        for user in make_users(5):
+            tx.add(user)
+
+    assert len(engine.written()) == 5
+    assert engine.rolled_back == 2
+    assert tx.retried == 2
+
+
+def test_failures_starting_transactions_are_retried(no_retry_wait):
+    engine = StubEngine()
+    begin = engine.begin_transaction
+    fail = fail_times(1, ConnectionError("leader switch"))
+
+    def begin_transaction():
+        if error := fail(None, None):
+            raise error
+
+        return begin()
+
+    engine.begin_transaction = begin_transaction
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with tx:
+        tx.add(TxUserNode(name="john"))
+
+    assert len(engine.written()) == 1
+    assert tx.retried == 1
+
+
+def test_failed_rollbacks_keep_the_chunk_error(no_retry_wait, monkeypatch):
+    def rollback(self):
+        raise ConnectionError("connection lost")
+
+    monkeypatch.setattr(StubServerTransaction, "rollback", rollback)
+
+    engine = StubEngine(fail=fail_times(1, ConnectionError("deadlock")))
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with tx:
+        tx.add(TxUserNode(name="john"))
+
+    assert len(engine.written()) == 1
+    assert tx.retried == 1
+
+    engine = StubEngine(fail=fail_times(1, ValueError("syntax error")))
+
+    with pytest.raises(ValueError):
+        with CypherSQErzoTransaction(make_graph(engine)) as tx:
+            tx.add(TxUserNode(name="john"))
+
+
+def test_retries_are_limited(no_retry_wait):
+    engine = StubEngine(fail=fail_times(10, ConnectionError("deadlock")))
+    tx = CypherSQErzoTransaction(make_graph(engine), retries=3)
+
+    with pytest.raises(ConnectionError):
+        with tx:
+            tx.add(TxUserNode(name="john"))
+
+    assert tx.retried == 3
+    assert engine.written() == []
+
+
+def test_other_errors_are_not_retried(no_retry_wait):
+    engine = StubEngine(fail=fail_times(1, ValueError("syntax error")))
+    tx = CypherSQErzoTransaction(make_graph(engine))
+
+    with pytest.raises(ValueError):
+        with tx:
+            tx.add(TxUserNode(name="john"))
+
+    assert tx.retried == 0
+    assert engine.rolled_back == 1
+
+
+def test_async_transient_errors_are_retried(no_retry_wait):
+    engine = AsyncStubEngine(fail=fail_times(2, ConnectionError("deadlock")))
+    tx = AsyncCypherSQErzoTransaction(make_graph(engine))
+
+    for user in make_users(5):
+        tx.add(user)
+
+    asyncio.run(tx.commit())
+
+    assert len(engine.written()) == 5
+    assert tx.retried == 2
+
+
+def test_atomic_transactions_roll_back_on_errors():
+    engine = StubEngine(size=5, min_size=5, max_size=5)
+    graph = make_graph(engine)
+
+    with pytest.raises(RuntimeError):
+        with CypherSQErzoTransaction(graph, atomic=True) as tx:
+            for user in make_users(12):
+                tx.add(user)
+
+            raise RuntimeError("Import failed")
+
+    assert engine.committed == []
+    assert engine.rolled_back == 1
@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import pytest
+
+from sqerzo import GraphNode
+from sqerzo.config import SQErzoConfig
+from sqerzo.graph.batch import AdaptiveBatchSize
+from sqerzo.graph.cypher.redisgraph import RedisSQErzoGraphConnection
+
+
+@dataclass
+class UpdatedUserNode(GraphNode):
+    __keys__ = ["name"]
+
+    name: str = None
+    age: int = None
+
+
+class SlottedUpdatedUserNode(GraphNode):
+    __slotted__ = True
+    __keys__ = ["name"]
+
+    name: str = None
+    age: int = None
+
+
+class UpdateRecorder(RedisSQErzoGraphConnection):
+    """Connection that records queries"""
+
+    def __init__(self, batch_size: int = 10):
+        self.batch_sizer = AdaptiveBatchSize(size=batch_size, min_size=1)
+        self.queries = []
+
+    def query(self, query, **params):
+        self.queries.append((query, params))
+
+
+@pytest.fixture(autouse=True)
+def multiple_labels(monkeypatch):
+    monkeypatch.setitem(SQErzoConfig, "SUPPORTED_MULTIPLE_LABELS", True)
+    monkeypatch.setitem(SQErzoConfig, "SUPPORTED_TYPES", ("str", "int"))
+
+
+def loaded(cls, **properties):
+    """Node as read from the DB"""
+    node = cls.from_query_results(SimpleNamespace(properties=properties))
+    node.make_identity()
+    node.clear_dirty()
+
+    return node
+
+
+@pytest.mark.parametrize("cls", [UpdatedUserNode, SlottedUpdatedUserNode])
+def test_nodes_are_grouped_by_changes(cls):
+    engine = UpdateRecorder(batch_size=2)
+
+    users = [loaded(cls, name=f"user-{i}", age=i) for i in range(6)]
+
+    for user in users[:3]:
+        user.age += 1
+
+    users[3].name = "renamed"
+
+    users[4].age = 40
+    users[4].add_label("Admin")
+
+    # users[5] isn't changed
+
+    updated = engine.update_elements(users)
+
+    assert updated == users[:5]
+
+    queries = [
+        (q, [row for row in params["batch"]]) for q, params in engine.queries
+    ]
+
+    # age: 2 + 1 nodes, name: 1 node, age + label: 1 node
+    assert len(queries) == 4
+
+    assert [len(rows) for _, rows in queries] == [2, 1, 1, 1]
+    assert queries[0][1] == [
+        [users[0].identity, 1], [users[1].identity, 2]
+    ]
+    assert "SET n.age = row[1]" in queries[0][0]
+    assert "SET n.name = row[1]" in queries[2][0]
+    assert "SET n.age = row[1], n:Admin" in queries[3][0]
+
+
+@pytest.mark.parametrize("cls", [UpdatedUserNode, SlottedUpdatedUserNode])
+def test_unchanged_nodes_are_not_updated(cls):
+    engine = UpdateRecorder()
+    user = loaded(cls, name="john", age=30)
+
+    assert engine.update_element(user) is False
+    assert engine.update_elements([user]) == []
+    assert engine.queries == []
+
+
+@pytest.mark.parametrize("cls", [UpdatedUserNode, SlottedUpdatedUserNode])
+def test_dirty_state_is_reset_per_instance(cls):
+    engine = UpdateRecorder()
+
+    john = loaded(cls, name="john", age=30)
+    mary = loaded(cls, name="mary", age=20)
+
+    john.age = 31
+    john.add_label("Admin")
+    mary.age = 21
+
+    assert engine.update_element(john) is True
+
+    assert john.dirty_properties() == []
+    assert john.dirty_labels() == []
+    assert mary.dirty_properties() == ["age"]
+    assert mary.dirty_labels() == []
+
+    # Second update of the same changes is a no-op
+    assert engine.update_element(john) is False
+    assert len(engine.queries) == 1
+
+
+def test_changed_properties_entries_are_updated():
+    engine = UpdateRecorder()
+    user = loaded(UpdatedUserNode, name="john", age=30, city="Madrid")
+
+    user.properties["city"] = "Bilbao"
+
+    engine.update_elements([user])
+
+    [(q, params)] = engine.queries
+    assert "n.city = row[1]" in q
+    assert params["batch"] == [[user.identity, "Bilbao"]]
+    assert user.properties.dirty_keys() == []
+
+
+def test_slotted_fields_are_tracked_with_a_bit_mask():
+    user = SlottedUpdatedUserNode(name="john", age=30)
+
+    # Fields set by __init__ aren't changes
+    assert user.dirty_properties() == []
+    assert not hasattr(user, "__dict__")
+
+    user.age = 31
+    user.name = "johnny"
+
+    assert user.dirty_properties() == ["name", "age"]
+
+    user.clear_dirty("name")
+    assert user.dirty_properties() == ["age"]
+
+    user.clear_dirty()
+    assert user.dirty_properties() == []
+
+    # Other instances have their own mask
+    other = SlottedUpdatedUserNode(name="mary")
+    other.age = 20
+
+    assert other.dirty_properties() == ["age"]
+    assert user.dirty_properties() == []
+
+
+def test_slotted_added_labels_are_tracked_per_instance():
+    user = SlottedUpdatedUserNode(name="john")
+    other = SlottedUpdatedUserNode(name="mary")
+
+    user.add_label("Admin")
+
+    assert user.dirty_labels() == ["Admin"]
+    assert other.dirty_labels() == []
+    assert user.labels() == "SlottedUpdatedUser:Admin"
+
+    user.clear_dirty()
+
+    assert user.dirty_labels() == []
+    assert user.labels() == "SlottedUpdatedUser:Admin"